@@ -0,0 +1,75 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# Conditional GET for polled JSON endpoints.
+# A view builds a weak ETag from values it already has in hand (ids, updated_at,
+# counters, friendship versions) before serializing anything. If the client's
+# If-None-Match matches, it answers 304 with no body.
+
+
+def compute_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    # Weak comparison: W/ prefixes are ignored
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
+def set_etag(response, etag):
+    response['ETag'] = etag
+
+    # Responses depend on the logged-in user: shared caches must not reuse them,
+    # private caches must revalidate every time
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified(etag):
+    return set_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+
+# Named data versions, for state an ETag cannot read cheaply (e.g. names of
+# comment authors that are only loaded after the ETag check). Bump on change.
+
+def _version_key(name):
+    return f'etags:version:{name}'
+
+
+def get_version(name):
+    key = _version_key(name)
+    version = cache.get(key)
+
+    if version is None:
+        # Start from a timestamp so an evicted version never reuses an old value
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(name):
+    def bump():
+        try:
+            cache.incr(_version_key(name))
+        except ValueError:
+            # Not cached yet, the next read starts a new version
+            pass
+
+    # Now, and again after commit so a tag computed from pre-commit data is dropped
+    bump()
+    transaction.on_commit(bump)
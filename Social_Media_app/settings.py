@@ -23,6 +23,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Let the web server send media bytes: "" (Django streams them), "X-Accel-Redirect" (nginx)
+# or "X-Sendfile" (Apache/lighttpd). For nginx, MEDIA_ACCEL_REDIRECT_PREFIX must be an internal location.
+MEDIA_SENDFILE_HEADER = os.getenv("MEDIA_SENDFILE_HEADER", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Media files are stored once per SHA-256 of their content (posts.storage)
+STORAGES = {
+    "default": {
+        "BACKEND": "posts.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
 
@@ -59,6 +74,84 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Cache: local memory by default. Point it at a shared backend (Redis/Memcached)
+# in production so cached friend sets are shared and invalidated across processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+FRIEND_IDS_CACHE_TIMEOUT = 60 * 60  # seconds, versioned keys are invalidated on friendship changes
+PROFILE_CARD_CACHE_TIMEOUT = 10 * 60  # seconds, cards are also deleted on profile/friendship changes
+
+# Feed pagination (cursor based)
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", 20))
+FEED_MAX_PAGE_SIZE = int(os.getenv("FEED_MAX_PAGE_SIZE", 100))
+FEED_COMMENT_PREVIEW_SIZE = 3  # latest comments embedded per feed post
+
+# Comment listing pagination (cursor based)
+COMMENT_PAGE_SIZE = 50
+COMMENT_MAX_PAGE_SIZE = 200
+
+# Materialized timelines (fan-out-on-write)
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", 5000))  # above this friend count posts are pulled on read
+TIMELINE_BATCH_SIZE = 1000  # rows per INSERT when pushing a post
+TIMELINE_BACKFILL_LIMIT = 200  # recent posts copied when a friendship is accepted
+
+# Like/comment counters: number of shard rows per post that absorb concurrent writes
+POST_COUNTER_SHARDS = 8
+
+# Background tasks (in-process worker pool)
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", 2))
+BACKGROUND_TASKS_EAGER = os.getenv("BACKGROUND_TASKS_EAGER", "False") == "True"  # run inline after commit
+
+# Background "delete all comments": rows deleted per transaction
+COMMENT_PURGE_BATCH_SIZE = 500
+
+# Trending posts (refresh_trending command)
+TRENDING_WINDOW_HOURS = 48  # likes/comments older than this are ignored
+TRENDING_HALF_LIFE_HOURS = 6  # an hour of engagement counts half as much after this long
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_SIZE = 1000  # posts kept in the ranked table
+
+# User typeahead (users/search/)
+USER_SEARCH_LIMIT = 10
+USER_SEARCH_MAX_LIMIT = 20
+USER_SEARCH_CANDIDATES = 50  # prefix matches per column that get ranked
+
+# Friend suggestions (friends/suggestions/)
+FRIEND_SUGGESTIONS_PER_USER = 50  # best candidates stored per user
+FRIEND_SUGGESTION_LIMIT = 10  # default page of the endpoint, max FRIEND_SUGGESTIONS_PER_USER
+
+# Mutual friends listing (friends/mutual/<username>/)
+MUTUAL_FRIENDS_PAGE_SIZE = 20
+MUTUAL_FRIENDS_MAX_PAGE_SIZE = 100
+
+# Full-text search (SQLite FTS5, see posts.search)
+SEARCH_MAX_TERMS = 10  # words of a query that are used
+SEARCH_BATCH_SIZE = 100  # index candidates read per visibility-filter round
+SEARCH_MAX_RESULTS = 1000  # cap of index matches used by admin search
+
+# Bulk like endpoint
+BULK_LIKE_MAX_OPERATIONS = 100
+
+# Chunked (resumable) media uploads
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, 'upload_sessions')  # temp files of unfinished uploads
+UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", 512 * 1024 * 1024))
+UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_EXPIRY_HOURS = 24  # unfinished sessions older than this are removed by cleanup_uploads
+
+# Responsive image derivatives, built in the background for every PostMedia image
+MEDIA_DERIVATIVE_WIDTHS = (320, 640, 1080)
+MEDIA_DERIVATIVE_FORMAT = 'WEBP'  # WEBP / JPEG
+MEDIA_DERIVATIVE_QUALITY = 80
+
+# Unreferenced media blobs are kept this long before gc_media_blobs deletes them
+MEDIA_BLOB_GC_GRACE_MINUTES = 60
+
 SIMPLE_JWT = {
     # Access token lifetime
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),  # Example: 2 hours
@@ -117,6 +210,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File based test database: in-memory SQLite fails concurrent writers
+        # immediately instead of waiting for the lock (see posts concurrency tests)
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
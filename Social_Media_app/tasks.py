@@ -0,0 +1,45 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Small in-process worker pool for work that must not block the request
+# (bulk deletes, image processing, ...). Tasks start after the current
+# transaction commits so they always see the rows the request wrote.
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='background'
+        )
+
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        # Worker threads get their own DB connection, don't leak it
+        connection.close()
+
+
+def run_in_background(func, *args, **kwargs):
+    # Schedule func(*args, **kwargs) on the worker pool once the transaction commits.
+    # With BACKGROUND_TASKS_EAGER the task runs inline instead (tests, debugging).
+
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
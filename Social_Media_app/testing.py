@@ -0,0 +1,29 @@
+import re
+import unittest
+
+from django.db import connection
+
+
+# Query-plan regression checks for tests.
+# Runs EXPLAIN QUERY PLAN (SQLite) on a queryset and fails when a table is read
+# with a full scan, i.e. a "SCAN <table or alias>" step that uses no index.
+# Index scans, subquery results and temp b-trees (ORDER BY / DISTINCT) are fine.
+
+_full_scan_re = re.compile(r'^SCAN (?:TABLE )?(?!\(|CONSTANT ROW)\S+(?: AS \S+)?$')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTestMixin:
+
+    def get_query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, queryset):
+        plan = self.get_query_plan(queryset)
+
+        if any(_full_scan_re.match(step) for step in plan):
+            self.fail("Full table scan in query plan:\n    " + "\n    ".join(plan))
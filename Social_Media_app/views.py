@@ -0,0 +1,153 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+# Media file serving with byte ranges and conditional requests.
+# Videos can be seeked (Range -> 206) and repeat loads are answered with 304
+# (ETag / Last-Modified). With MEDIA_SENDFILE_HEADER set, the front web server
+# sends the bytes (X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd).
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+BLOCK_SIZE = 64 * 1024
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found.")
+
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    stat = os.stat(full_path)
+    size = stat.st_size
+    last_modified = http_date(stat.st_mtime)
+
+    # Content-addressed files never change: the hash is a strong validator
+    immutable = default_storage.is_blob_name(path)
+    if immutable:
+        etag = f'"{os.path.splitext(os.path.basename(path))[0]}"'
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Accept-Ranges': 'bytes',
+    }
+    if immutable:
+        headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE_HEADER:
+        # The web server handles Range itself
+        response = HttpResponse(content_type=content_type)
+
+        if settings.MEDIA_SENDFILE_HEADER == 'X-Accel-Redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        else:
+            response[settings.MEDIA_SENDFILE_HEADER] = full_path
+    else:
+        try:
+            byte_range = get_range(request, size, etag, last_modified)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_range(full_path, start, end),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+
+    for name, value in headers.items():
+        response[name] = value
+
+    return response
+
+
+def not_modified(request, etag, mtime):
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(mtime) <= since
+
+
+def get_range(request, size, etag, last_modified):
+    # (start, end) of a single satisfiable byte range, None to send the whole file.
+    # Raises ValueError for an unsatisfiable range (-> 416).
+
+    header = request.headers.get('Range')
+    if not header:
+        return None
+
+    # If-Range: only send a part if the client's copy is still current
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range not in (etag, last_modified):
+        return None
+
+    # Multiple or malformed ranges: the whole file is a valid answer
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+
+    return start, end
+
+
+def read_range(full_path, start, end):
+    with open(full_path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+
+        while remaining > 0:
+            block = file.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from friends.models import FriendRequest, Friendship
+from friends.models import FriendRequest, FriendSuggestion, Friendship
 
 
 # Register your models here.
@@ -54,4 +54,26 @@ class FriendshipAdmin(admin.ModelAdmin):
 
     ordering = ("-created_at",)
 
-    readonly_fields = ("created_at",)
\ No newline at end of file
+    readonly_fields = ("created_at",)
+
+@admin.register(FriendSuggestion)
+class FriendSuggestionAdmin(admin.ModelAdmin):
+
+    # Precomputed suggestions (read-only, rebuilt by refresh_friend_suggestions)
+
+    list_display = (
+        "id",
+        "user",
+        "suggested",
+        "mutual_count",
+        "computed_at",
+    )
+
+    search_fields = (
+        "user__email",
+        "user__username",
+    )
+
+    raw_id_fields = ("user", "suggested")
+
+    readonly_fields = ("mutual_count", "computed_at")
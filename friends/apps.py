@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class FriendsConfig(AppConfig):
+    name = 'friends'
+
+    def ready(self):
+        import friends.signals  # connect signals
@@ -0,0 +1,119 @@
+import time
+from array import array
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+from friends.models import FriendEdge
+
+
+# Friend-id sets.
+# A user's friend ids are loaded with one id-only query, stored in the shared cache as a
+# packed integer array and memoized for the rest of the current request.
+# Cache keys carry a per-user friendship version that is bumped whenever a friendship of
+# that user is created or deleted (see friends.signals), so stale sets are never read.
+
+
+# Per-request memo {user_id: (sorted array, frozenset)}, only active while a request is being handled
+_request_memo = ContextVar('friend_ids_memo', default=None)
+
+
+@receiver(request_started)
+def _start_request_memo(**kwargs):
+    _request_memo.set({})
+
+
+@receiver(request_finished)
+def _end_request_memo(**kwargs):
+    _request_memo.set(None)
+
+
+def _version_key(user_id):
+    return f'friends:version:{user_id}'
+
+
+def _ids_key(user_id, version):
+    return f'friends:ids:{user_id}:{version}'
+
+
+def get_friendship_version(user_id):
+    # Current friendship version of a user (changes on every friend add/remove)
+
+    key = _version_key(user_id)
+    version = cache.get(key)
+
+    if version is None:
+        # Start from a timestamp so an evicted version never reuses an old key
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def invalidate_friend_ids(*user_ids):
+    memo = _request_memo.get()
+
+    for user_id in user_ids:
+        if memo is not None:
+            memo.pop(user_id, None)
+
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            # Version not cached yet, nothing stale can be read
+            pass
+
+
+def _load_friend_ids(user_id):
+    # (sorted id array, frozenset) of a user's friends
+
+    key = _ids_key(user_id, get_friendship_version(user_id))
+    packed = cache.get(key)
+
+    if packed is None:
+        # One range scan of the (user, friend) index, already in id order
+        friend_ids = FriendEdge.objects.filter(
+            user_id=user_id
+        ).order_by('friend_id').values_list('friend_id', flat=True)
+
+        packed = array('q', friend_ids).tobytes()
+        cache.set(key, packed, settings.FRIEND_IDS_CACHE_TIMEOUT)
+
+    friend_ids = array('q')
+    friend_ids.frombytes(packed)
+    return friend_ids, frozenset(friend_ids)
+
+
+def _memoized(user_id):
+    memo = _request_memo.get()
+
+    if memo is None:
+        return _load_friend_ids(user_id)
+
+    loaded = memo.get(user_id)
+
+    if loaded is None:
+        loaded = memo[user_id] = _load_friend_ids(user_id)
+
+    return loaded
+
+
+def load_friend_ids(user_id):
+    # Friend ids of a user id as a frozenset, memoized for the current request
+    return _memoized(user_id)[1]
+
+
+def load_sorted_friend_ids(user_id):
+    # Friend ids of a user id as an ascending array (for merge-based intersections)
+    return _memoized(user_id)[0]
+
+
+def get_friend_ids(user):
+    return load_friend_ids(user.id)
+
+
+def are_friends(user, other):
+    return other.id in get_friend_ids(user)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from friends.models import FriendEdge, Friendship
+
+
+# Maintenance of the FriendEdge mirror table.
+# Friendship stays the source of truth (one row per pair); every friendship is
+# mirrored as two directed edges so lookups by user never need user1 OR user2.
+
+
+def add_friend_edges(user_id, friend_id):
+    FriendEdge.objects.bulk_create(
+        [
+            FriendEdge(user_id=user_id, friend_id=friend_id),
+            FriendEdge(user_id=friend_id, friend_id=user_id),
+        ],
+        ignore_conflicts=True
+    )
+
+
+def remove_friend_edges(user_id, friend_id):
+    FriendEdge.objects.filter(
+        Q(user_id=user_id, friend_id=friend_id) | Q(user_id=friend_id, friend_id=user_id)
+    ).delete()
+
+
+def rebuild_friend_edges(batch_size=None):
+    # Mirror every friendship (missing edges are added, edges without a
+    # friendship are removed). Returns (friendships mirrored, edges removed).
+
+    batch_size = batch_size or settings.TIMELINE_BATCH_SIZE
+    mirrored = 0
+    last_id = 0
+
+    while True:
+        pairs = list(
+            Friendship.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'user1_id', 'user2_id')[:batch_size]
+        )
+        if not pairs:
+            break
+
+        edges = []
+        for _, user1, user2 in pairs:
+            edges.append(FriendEdge(user_id=user1, friend_id=user2))
+            edges.append(FriendEdge(user_id=user2, friend_id=user1))
+
+        FriendEdge.objects.bulk_create(edges, ignore_conflicts=True)
+        mirrored += len(pairs)
+
+        last_id = pairs[-1][0]
+
+    removed, _ = FriendEdge.objects.exclude(
+        Exists(Friendship.objects.filter(user1=OuterRef('user'), user2=OuterRef('friend')))
+    ).exclude(
+        Exists(Friendship.objects.filter(user1=OuterRef('friend'), user2=OuterRef('user')))
+    ).delete()
+
+    return mirrored, removed
@@ -0,0 +1,81 @@
+from bisect import bisect_left
+from collections import Counter
+
+from django.db.models import Count
+
+from friends.cache import load_sorted_friend_ids
+from friends.models import FriendEdge
+
+
+# Set-based queries over the friendship graph (id-only, no User rows).
+
+# Ids per IN (...) list, keeps queries under the database's parameter limit
+ID_CHUNK_SIZE = 500
+
+
+def _chunks(ids, size=ID_CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def friend_ids_query(user_id):
+    # Subquery of a user's friend ids, for joins such as Post.author__in=...
+    return FriendEdge.objects.filter(user_id=user_id).values('friend_id')
+
+
+def mutual_counts(user, candidate_ids):
+    # {candidate_id: friends shared with user}, candidates without mutual friends are omitted
+
+    candidate_ids = set(candidate_ids)
+    if not candidate_ids:
+        return Counter()
+
+    # Candidates' edges that end at one of the user's friends
+    rows = FriendEdge.objects.filter(
+        user_id__in=candidate_ids,
+        friend_id__in=friend_ids_query(user.id)
+    ).values('user_id').annotate(count=Count('friend_id')).values_list('user_id', 'count').order_by()
+
+    return Counter(dict(rows))
+
+
+def intersect_sorted(a, b):
+    # Common values of two ascending id sequences, ascending
+
+    if len(a) > len(b):
+        a, b = b, a
+
+    result = []
+    if not a:
+        return result
+
+    if len(a) * 8 < len(b):
+        # Very different sizes: binary search the small side's ids in the large one
+        position = 0
+        for value in a:
+            position = bisect_left(b, value, position)
+            if position == len(b):
+                break
+            if b[position] == value:
+                result.append(value)
+        return result
+
+    # Linear merge
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            result.append(a[i])
+            i += 1
+            j += 1
+
+    return result
+
+
+def mutual_friend_ids(user_id, other_id):
+    # Ascending ids of the friends two users share
+    return intersect_sorted(load_sorted_friend_ids(user_id), load_sorted_friend_ids(other_id))
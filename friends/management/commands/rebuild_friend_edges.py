@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from friends.edges import rebuild_friend_edges
+
+
+class Command(BaseCommand):
+
+    # Fill the FriendEdge mirror table from Friendship (run once after upgrading, or to
+    # repair it after friendships were written without signals, e.g. raw SQL imports).
+    # Usage: python manage.py rebuild_friend_edges --batch-size 1000
+
+    help = "Mirror every friendship into directed friend edges."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        mirrored, removed = rebuild_friend_edges(options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Mirrored {mirrored} friendship(s), removed {removed} stale edge(s)."
+        ))
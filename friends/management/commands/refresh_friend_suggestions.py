@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from friends.suggestions import rebuild_suggestions
+
+
+class Command(BaseCommand):
+
+    # Recompute every user's friend suggestions. Friendship changes keep them up to
+    # date incrementally; run this after imports or periodically (e.g. nightly from cron).
+    # Usage: python manage.py refresh_friend_suggestions
+
+    help = "Rebuild the friends-of-friends suggestion table."
+
+    def handle(self, *args, **options):
+        total = rebuild_suggestions()
+
+        self.stdout.write(self.style.SUCCESS(f"Stored {total} friend suggestion(s)."))
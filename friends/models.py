@@ -37,6 +37,11 @@ class FriendRequest(models.Model):
     class Meta:
         # Prevent duplicate friend requests (same sender → receiver)
         unique_together = ('sender', 'receiver')
+        indexes = [
+            # Incoming / outgoing pending requests of a user (PendingFriendRequestsView)
+            models.Index(fields=['receiver', 'status'], name='friendreq_receiver_status_idx'),
+            models.Index(fields=['sender', 'status'], name='friendreq_sender_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender} → {self.receiver} ({self.status})"
@@ -65,3 +70,59 @@ class Friendship(models.Model):
 
     def __str__(self):
         return f"{self.user1} ↔ {self.user2}"
+
+class FriendEdge(models.Model):
+
+    # Directed mirror of Friendship: rows (a, b) and (b, a) for every friendship,
+    # kept in sync by friends.signals. A user's friends are one index range on
+    # (user, friend) instead of an OR over user1 / user2.
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='friend_edges'
+    )
+
+    friend = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        # Also the (user, friend) index every lookup uses
+        unique_together = ('user', 'friend')
+
+    def __str__(self):
+        return f"{self.user_id} → {self.friend_id}"
+
+class FriendSuggestion(models.Model):
+
+    # "People you may know": precomputed friends-of-friends of a user, ranked by
+    # mutual friend count (top FRIEND_SUGGESTIONS_PER_USER, see friends.suggestions).
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='friend_suggestions'
+    )
+
+    suggested = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='suggested_to'
+    )
+
+    mutual_count = models.PositiveIntegerField()
+
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'suggested')
+        indexes = [
+            # A user's suggestions in rank order are one range scan
+            models.Index(fields=['user', '-mutual_count', 'suggested'], name='suggestion_user_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.suggested} for {self.user} ({self.mutual_count} mutual)"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from friends.models import FriendRequest
+from friends.models import FriendRequest, FriendSuggestion
 from users.models import User
 
 
@@ -68,4 +68,22 @@ class FriendRequestSerializer(serializers.ModelSerializer):
             "status",
             "created_at",
         ]
-        read_only_fields = fields
\ No newline at end of file
+        read_only_fields = fields
+
+class FriendSuggestionSerializer(serializers.ModelSerializer):
+
+    # "People you may know" entry: the suggested user and the number of mutual friends
+
+    id = serializers.IntegerField(source='suggested.id', read_only=True)
+    username = serializers.CharField(source='suggested.username', read_only=True)
+    profile_picture = serializers.ImageField(source='suggested.profile.profile_picture', read_only=True)
+    mutual_friends = serializers.IntegerField(source='mutual_count', read_only=True)
+
+    class Meta:
+        model = FriendSuggestion
+        fields = [
+            'id',
+            'username',
+            'profile_picture',
+            'mutual_friends',
+        ]
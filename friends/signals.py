@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from friends.cache import invalidate_friend_ids
+from friends.edges import add_friend_edges, remove_friend_edges
+from friends.models import FriendRequest, Friendship
+from friends.suggestions import hide_pair_suggestions, refresh_suggestions_around, score_pair_suggestions
+from Social_Media_app.tasks import run_in_background
+
+
+def _invalidate(friendship):
+    user_ids = (friendship.user1_id, friendship.user2_id)
+
+    # Now for reads in this transaction, and again after commit so a set
+    # loaded by a concurrent request before the commit is not kept
+    invalidate_friend_ids(*user_ids)
+    transaction.on_commit(lambda: invalidate_friend_ids(*user_ids))
+
+
+@receiver(post_save, sender=Friendship)
+def friendship_created(sender, instance, created, **kwargs):
+    if created:
+        add_friend_edges(instance.user1_id, instance.user2_id)
+        _invalidate(instance)
+        run_in_background(refresh_suggestions_around, instance.user1_id, instance.user2_id)
+
+
+@receiver(post_delete, sender=Friendship)
+def friendship_deleted(sender, instance, **kwargs):
+    remove_friend_edges(instance.user1_id, instance.user2_id)
+    _invalidate(instance)
+    run_in_background(refresh_suggestions_around, instance.user1_id, instance.user2_id)
+
+
+# A request only changes whether its two users suggest each other. Rejecting keeps
+# them hidden and accepting is handled by the new Friendship, so only a new
+# request and a withdrawn one touch the table.
+
+@receiver(post_save, sender=FriendRequest)
+def friend_request_saved(sender, instance, created, **kwargs):
+    if created and instance.status in ('pending', 'rejected'):
+        run_in_background(hide_pair_suggestions, instance.sender_id, instance.receiver_id)
+
+
+@receiver(post_delete, sender=FriendRequest)
+def friend_request_deleted(sender, instance, **kwargs):
+    if instance.status in ('pending', 'rejected'):
+        run_in_background(score_pair_suggestions, instance.sender_id, instance.receiver_id)
@@ -0,0 +1,188 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from friends.graph import _chunks
+from friends.models import FriendEdge, FriendRequest, FriendSuggestion
+
+
+# Friend suggestions ("people you may know").
+# Candidates of a user are the friends of their friends, scored by the number of
+# mutual friends. Scoring is one INSERT ... SELECT in the database: the FriendEdge
+# table is joined with itself (user -> friend -> candidate), grouped per
+# (user, candidate) and cut to the best FRIEND_SUGGESTIONS_PER_USER per user with
+# ROW_NUMBER(). Existing friends and pairs with a pending or rejected friend
+# request (in either direction) are never suggested.
+# The full table is rebuilt by refresh_friend_suggestions. A friendship change
+# rescores its two users and recounts only the pairs it is a mutual friend of;
+# friend requests only hide or rescore their own pair. Pairs that were cut
+# from a full list are not reconsidered until the next rebuild.
+
+
+def _excluded_sql(user, suggested):
+    # Pairs that are never suggested: already friends, or a pending/rejected request
+
+    edges = FriendEdge._meta.db_table
+    friend_request = FriendRequest._meta.db_table
+
+    return f"""
+        NOT EXISTS (
+            SELECT 1 FROM {edges} f
+            WHERE f.user_id = {user} AND f.friend_id = {suggested}
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM {friend_request} r
+            WHERE r.status IN ('pending', 'rejected')
+              AND ((r.sender_id = {user} AND r.receiver_id = {suggested})
+                OR (r.sender_id = {suggested} AND r.receiver_id = {user}))
+        )
+    """
+
+
+def _scoring_sql(user_count):
+    edges = FriendEdge._meta.db_table
+    suggestion = FriendSuggestion._meta.db_table
+
+    user_filter = ''
+    if user_count is not None:
+        user_filter = f"AND e1.user_id IN ({', '.join(['%s'] * user_count)})"
+
+    return f"""
+        INSERT INTO {suggestion} (user_id, suggested_id, mutual_count, computed_at)
+        SELECT user_id, suggested_id, mutual_count, %s
+        FROM (
+            SELECT c.user_id, c.suggested_id, c.mutual_count,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY c.user_id ORDER BY c.mutual_count DESC, c.suggested_id
+                   ) AS position
+            FROM (
+                SELECT e1.user_id AS user_id, e2.friend_id AS suggested_id, COUNT(*) AS mutual_count
+                FROM {edges} e1
+                JOIN {edges} e2 ON e2.user_id = e1.friend_id
+                WHERE e2.friend_id <> e1.user_id {user_filter}
+                GROUP BY e1.user_id, e2.friend_id
+            ) c
+            WHERE {_excluded_sql('c.user_id', 'c.suggested_id')}
+        ) ranked
+        WHERE position <= %s
+    """
+
+
+def _pair_scoring_sql(users):
+    # Score the (user, %(suggested)s) pairs of the users selected by the `users`
+    # SQL that have no row yet, for users whose list is not full. Counts the
+    # mutual friends of those pairs only.
+
+    edges = FriendEdge._meta.db_table
+    suggestion = FriendSuggestion._meta.db_table
+
+    return f"""
+        INSERT INTO {suggestion} (user_id, suggested_id, mutual_count, computed_at)
+        SELECT e1.user_id, e2.user_id, COUNT(*), %(now)s
+        FROM {edges} e1
+        JOIN {edges} e2 ON e2.user_id = %(suggested)s AND e2.friend_id = e1.friend_id
+        WHERE e1.user_id IN ({users}) AND e1.user_id <> %(suggested)s
+          AND NOT EXISTS (
+              SELECT 1 FROM {suggestion} s
+              WHERE s.user_id = e1.user_id AND s.suggested_id = e2.user_id
+          )
+          AND (SELECT COUNT(*) FROM {suggestion} s WHERE s.user_id = e1.user_id) < %(limit)s
+          AND {_excluded_sql('e1.user_id', 'e2.user_id')}
+        GROUP BY e1.user_id, e2.user_id
+    """
+
+
+def _score_pairs(users, **params):
+    params.update(
+        now=connection.ops.adapt_datetimefield_value(timezone.now()),
+        limit=settings.FRIEND_SUGGESTIONS_PER_USER
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(_pair_scoring_sql(users), params)
+
+
+def _insert_suggestions(user_ids=None):
+    # Score and insert suggestions of user_ids (None: every user), returns the number of rows
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    params = [now] + list(user_ids or []) + [settings.FRIEND_SUGGESTIONS_PER_USER]
+
+    with connection.cursor() as cursor:
+        cursor.execute(_scoring_sql(None if user_ids is None else len(user_ids)), params)
+        return cursor.rowcount
+
+
+def rebuild_suggestions():
+    # Recompute the whole table, returns the number of stored suggestions
+
+    with transaction.atomic():
+        FriendSuggestion.objects.all().delete()
+        return _insert_suggestions()
+
+
+def refresh_suggestions(user_ids):
+    # Recompute the suggestions of some users
+
+    for chunk in _chunks(set(user_ids)):
+        with transaction.atomic():
+            FriendSuggestion.objects.filter(user_id__in=chunk).delete()
+            _insert_suggestions(chunk)
+
+
+def _rescore_pairs_through(user_id, other_id):
+    # other_id is (or was) a mutual friend of user_id and each of other_id's
+    # friends: recount those (friend, user_id) pairs only. Exact counts rather
+    # than +1/-1, as the task may run after later friendship changes committed.
+
+    edges = FriendEdge._meta.db_table
+
+    FriendSuggestion.objects.filter(
+        user__in=FriendEdge.objects.filter(user=other_id).values('friend'),
+        suggested=user_id
+    ).delete()
+
+    _score_pairs(
+        f"SELECT friend_id FROM {edges} WHERE user_id = %(via)s",
+        via=other_id,
+        suggested=user_id
+    )
+
+
+def refresh_suggestions_around(user_id, other_id):
+    # After a friendship between two users was added or removed: their own
+    # candidates changed and are rescored, and so is the pair of each of them
+    # with the other's friends (one mutual friend more or less)
+
+    refresh_suggestions([user_id, other_id])
+
+    with transaction.atomic():
+        _rescore_pairs_through(user_id, other_id)
+        _rescore_pairs_through(other_id, user_id)
+
+
+def hide_pair_suggestions(user_id, other_id):
+    # A pending request between two users: they no longer suggest each other
+
+    FriendSuggestion.objects.filter(
+        Q(user=user_id, suggested=other_id) | Q(user=other_id, suggested=user_id)
+    ).delete()
+
+
+def score_pair_suggestions(user_id, other_id):
+    # A request between two users was withdrawn: they may suggest each other again
+
+    with transaction.atomic():
+        hide_pair_suggestions(user_id, other_id)
+
+        for user, suggested in ((user_id, other_id), (other_id, user_id)):
+            _score_pairs('%(user)s', user=user, suggested=suggested)
+
+
+def get_suggestions(user, limit):
+    # Best suggestions of a user with the suggested users' profiles, one indexed read
+
+    return FriendSuggestion.objects.filter(
+        user=user
+    ).select_related('suggested__profile').order_by('-mutual_count', 'suggested')[:limit]
@@ -0,0 +1,111 @@
+import random
+
+from django.test import TestCase, override_settings
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from friends.graph import friend_ids_query
+from friends.models import FriendEdge, FriendRequest, FriendSuggestion, Friendship
+from friends.suggestions import get_suggestions, rebuild_suggestions
+from Social_Media_app.testing import QueryPlanTestMixin
+from users.models import User
+
+
+# Create your tests here.
+
+class FriendQueryPlanTests(QueryPlanTestMixin, TestCase):
+
+    # Hot friendship lookups must be served by an index, never a full table scan
+
+    def setUp(self):
+        self.user = User.objects.create(email="a@example.com", username="a")
+        self.other = User.objects.create(email="b@example.com", username="b")
+
+    def test_pending_requests(self):
+        # PendingFriendRequestsView: incoming and outgoing
+        self.assertNoFullScan(FriendRequest.objects.filter(receiver=self.user, status="pending"))
+        self.assertNoFullScan(FriendRequest.objects.filter(sender=self.user, status="pending"))
+
+    def test_request_between_users(self):
+        # SendFriendRequestView: pending request in either direction
+        self.assertNoFullScan(FriendRequest.objects.filter(
+            Q(sender=self.user, receiver=self.other, status="pending") |
+            Q(sender=self.other, receiver=self.user, status="pending")
+        ))
+
+    def test_friendship_between_users(self):
+        # UnfriendView
+        self.assertNoFullScan(Friendship.objects.filter(
+            Q(user1=self.user, user2=self.other) | Q(user1=self.other, user2=self.user)
+        ))
+
+    def test_friend_ids(self):
+        self.assertNoFullScan(
+            FriendEdge.objects.filter(user_id=self.user.id).order_by('friend_id').values_list('friend_id', flat=True)
+        )
+        self.assertNoFullScan(User.objects.filter(id__in=friend_ids_query(self.user.id)))
+
+    def test_suggestions(self):
+        self.assertNoFullScan(get_suggestions(self.user, 10))
+
+
+class FriendListTests(TestCase):
+
+    def test_friends_in_one_query(self):
+        user = User.objects.create(email="a@example.com", username="a")
+        friends = [User.objects.create(email=f"f{i}@example.com", username=f"f{i}") for i in range(3)]
+        User.objects.create(email="s@example.com", username="stranger")
+
+        for friend in friends:
+            Friendship.objects.create(user1=user, user2=friend)
+
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.assertNumQueries(1):
+            response = client.get('/api/friends/list/')
+
+        self.assertEqual([friend["username"] for friend in response.json()["friends"]], ["f0", "f1", "f2"])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, FRIEND_SUGGESTIONS_PER_USER=100)
+class FriendSuggestionUpdateTests(TestCase):
+
+    # Incremental updates must end where a full rebuild does (lists are never full here)
+
+    def setUp(self):
+        self.users = [User.objects.create(email=f"u{i}@example.com", username=f"u{i}") for i in range(12)]
+
+    def suggestions(self):
+        return set(FriendSuggestion.objects.values_list('user', 'suggested', 'mutual_count'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.suggestions()
+        rebuild_suggestions()
+        self.assertEqual(incremental, self.suggestions())
+
+    def change(self, rng, step):
+        user1, user2 = rng.choice(self.pairs)
+        friendship = Friendship.objects.filter(user1=user1, user2=user2).first()
+        friend_request = FriendRequest.objects.filter(sender=user1, receiver=user2).first()
+
+        if friendship:
+            friendship.delete()
+        elif friend_request:
+            friend_request.delete()
+        elif step % 4 == 0:
+            FriendRequest.objects.create(sender=user1, receiver=user2, status=rng.choice(['pending', 'rejected']))
+        else:
+            Friendship.objects.create(user1=user1, user2=user2)
+
+    def test_incremental_updates(self):
+        rng = random.Random(7)
+        self.pairs = [(a, b) for i, a in enumerate(self.users) for b in self.users[i + 1:]]
+
+        for step in range(40):
+            # Two changes per commit: tasks see changes made after their own
+            with self.subTest(step=step), self.captureOnCommitCallbacks(execute=True):
+                self.change(rng, step)
+                self.change(rng, step + 1)
+
+            self.assertMatchesRebuild()
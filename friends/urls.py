@@ -1,6 +1,6 @@
 from django.urls import path
 from friends.views import SendFriendRequestView, FriendListView, FriendRequestActionView, PendingFriendRequestsView, \
-    UnfriendView
+    UnfriendView, FriendSuggestionsView, MutualFriendsView
 
 urlpatterns = [
     path('send/<str:username>/', SendFriendRequestView.as_view(), name='send-friend-request'),
@@ -10,4 +10,6 @@ urlpatterns = [
     path("request/<int:request_id>/", FriendRequestActionView.as_view(), name="friend-request-action"),
     path('requests/', PendingFriendRequestsView.as_view(), name='pending-requests'),
     path('unfriend/<str:username>/', UnfriendView.as_view(), name='unfriend'),
+    path('suggestions/', FriendSuggestionsView.as_view(), name='friend-suggestions'),
+    path('mutual/<str:username>/', MutualFriendsView.as_view(), name='mutual-friends'),
 ]
\ No newline at end of file
@@ -3,12 +3,21 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
 
 from users.models import User
+from friends.cache import are_friends
+from friends.graph import friend_ids_query, mutual_friend_ids
 from friends.models import Friendship, FriendRequest
-from friends.serializers import FriendListSerializer, FriendRequestSerializer
+from friends.serializers import FriendListSerializer, FriendRequestSerializer, FriendSuggestionSerializer
+from friends.suggestions import get_suggestions
+from posts.pagination import KeysetPaginator
+from posts.timeline import link_timelines, unlink_timelines
 
 
 # Create your views here.
@@ -32,12 +41,7 @@ class SendFriendRequestView(APIView):
             )
 
         # 2- Already friends?
-        already_friends = Friendship.objects.filter(
-            Q(user1=sender, user2=receiver) |
-            Q(user1=receiver, user2=sender)
-        ).exists()
-
-        if already_friends:
+        if are_friends(sender, receiver):
             return Response(
                 {"error": "You are already friends."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -158,10 +162,6 @@ class FriendRequestActionView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Update status
-            friend_request.status = "accepted"
-            friend_request.save()
-
             # Normalize order to prevent (B,A) duplication
             user1 = friend_request.sender
             user2 = friend_request.receiver
@@ -169,7 +169,16 @@ class FriendRequestActionView(APIView):
             if user1.id > user2.id:
                 user1, user2 = user2, user1
 
-            Friendship.objects.create(user1=user1, user2=user2)
+            # Request, friendship and its mirrored edges (friends.signals) change together
+            with transaction.atomic():
+                # Update status
+                friend_request.status = "accepted"
+                friend_request.save()
+
+                Friendship.objects.create(user1=user1, user2=user2)
+
+                # Backfill each other's recent posts into the feeds
+                link_timelines(user1, user2)
 
             return Response(
                 {"message": "Friend request accepted."},
@@ -230,19 +239,10 @@ class FriendListView(APIView):
     def get(self, request):
         user = request.user
 
-        # Get all friendships where user is either user1 or user2
-        friendships = Friendship.objects.filter(
-            Q(user1=user) | Q(user2=user)
-        )
-
-        friends = []
-
-        # Extract the other user from each friendship
-        for friendship in friendships:
-            if friendship.user1 == user:
-                friends.append(friendship.user2)
-            else:
-                friends.append(friendship.user1)
+        # One query for users + profiles, friends are a subquery on the (user, friend) edge index
+        friends = User.objects.filter(
+            id__in=friend_ids_query(user.id)
+        ).select_related('profile').order_by('id')
 
         friend_serializer = FriendListSerializer(friends, many=True)
 
@@ -289,11 +289,92 @@ class UnfriendView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 3- Delete friendship (allows future friend requests)
-        friendship.delete()
+        with transaction.atomic():
+            # 3- Delete friendship and its mirrored edges (allows future friend requests)
+            friendship.delete()
 
-        # 4- Return success message
+            # 4- Remove each other's posts from the feeds
+            unlink_timelines(current_user, target_user)
+
+        # 5- Return success message
         return Response(
             {"message": "Unfriended successfully. You can send a friend request again."},
             status=status.HTTP_200_OK
-        )
\ No newline at end of file
+        )
+
+class FriendSuggestionsView(APIView):
+
+    # GET -> People you may know: friends of friends, most mutual friends first.
+    # ?limit=<n> (max FRIEND_SUGGESTIONS_PER_USER)
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', settings.FRIEND_SUGGESTION_LIMIT))
+        except ValueError:
+            limit = settings.FRIEND_SUGGESTION_LIMIT
+
+        limit = max(1, min(limit, settings.FRIEND_SUGGESTIONS_PER_USER))
+
+        suggestions = get_suggestions(request.user, limit)
+        serializer = FriendSuggestionSerializer(suggestions, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class MutualFriendsView(APIView):
+
+    # GET -> Friends shared with another user: total count + a page of them (ordered by id).
+    # The intersection is a merge of the two cached, sorted friend id arrays; only the
+    # page's users are loaded. ?cursor=<next/prev>&page_size=<n>
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, username):
+        other = get_object_or_404(User, username=username)
+
+        if other == request.user:
+            return Response(
+                {"error": "You cannot list mutual friends with yourself."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        mutual_ids = mutual_friend_ids(request.user.id, other.id)
+
+        paginator = KeysetPaginator(
+            request,
+            ordering=('id',),
+            page_size=settings.MUTUAL_FRIENDS_PAGE_SIZE,
+            max_page_size=settings.MUTUAL_FRIENDS_MAX_PAGE_SIZE,
+            model=User
+        )
+        direction, position = paginator.decode_cursor(request.query_params.get(paginator.cursor_query_param))
+
+        # Slice of the id list after / before the cursor's id
+        if position is None:
+            start = 0
+            end = min(paginator.page_size, len(mutual_ids))
+        elif direction == 'next':
+            start = bisect_right(mutual_ids, position[0])
+            end = min(start + paginator.page_size, len(mutual_ids))
+        else:
+            end = bisect_left(mutual_ids, position[0])
+            start = max(0, end - paginator.page_size)
+
+        friends = list(
+            User.objects.filter(id__in=mutual_ids[start:end]).select_related('profile').order_by('id')
+        )
+
+        if friends:
+            if end < len(mutual_ids):
+                paginator.next_cursor = paginator.encode_cursor('next', friends[-1])
+            if start > 0:
+                paginator.prev_cursor = paginator.encode_cursor('prev', friends[0])
+
+        serializer = FriendListSerializer(friends, many=True, context={'request': request})
+
+        return Response({
+            "count": len(mutual_ids),
+            "next": paginator.next_cursor,
+            "prev": paginator.prev_cursor,
+            "results": serializer.data,
+        })
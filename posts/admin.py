@@ -1,9 +1,34 @@
 from django.contrib import admin
 from posts.models import PostMedia, Post, PostLike, Comment
+from posts.search import match, search_available
 
 
 # Register your models here.
 
+class FullTextSearchMixin:
+
+    # Admin search on 'content' through the FTS5 index (posts.search) instead of
+    # LIKE '%...%'. Other search_fields keep the default lookups.
+
+    fts_table = None
+
+    def get_search_fields(self, request):
+        fields = super().get_search_fields(request)
+
+        if search_available():
+            fields = [field for field in fields if field != 'content']
+
+        return fields
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+
+        if search_term and search_available():
+            ids = [row_id for row_id, _ in match(self.fts_table, search_term)]
+            results |= queryset.filter(id__in=ids)
+
+        return results, may_have_duplicates
+
 # Inline for PostMedia (show media directly in Post admin)
 class PostMediaInline(admin.TabularInline):
 
@@ -14,7 +39,7 @@ class PostMediaInline(admin.TabularInline):
     readonly_fields = ['created_at']
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
 
     # Custom admin configuration for Post model.
     list_display = [
@@ -28,7 +53,8 @@ class PostAdmin(admin.ModelAdmin):
         'created_at',
     ]
     list_filter = ['visibility', 'created_at']
-    search_fields = ['author__username', 'author__email']
+    search_fields = ['author__username', 'author__email', 'content']
+    fts_table = 'posts_post_fts'
     readonly_fields = ['created_at', 'updated_at', 'likes_count', 'comments_count']
     inlines = [PostMediaInline]
 
@@ -38,15 +64,19 @@ class PostAdmin(admin.ModelAdmin):
     #
     # content_snippet.short_description = 'Content'
 
+    def get_queryset(self, request):
+        # Author and pending counter deltas in two queries for the whole page
+        return super().get_queryset(request).select_related('author').prefetch_related('counter_shards')
+
     # Likes count
     def likes_count(self, obj):
-        return obj.likes.count()
+        return obj.total_likes
 
     likes_count.short_description = 'Likes'
 
     # Comments count
     def comments_count(self, obj):
-        return obj.comments.count()
+        return obj.total_comments
 
     comments_count.short_description = 'Comments'
 
@@ -74,8 +104,9 @@ class PostLikeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['id', 'post', 'author', 'comment_number', 'content', 'created_at']
     search_fields = ['author__username', 'content', 'post__id']
+    fts_table = 'posts_comment_fts'
     list_filter = ['created_at']
     readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class PostsConfig(AppConfig):
+    name = 'posts'
+
+    def ready(self):
+        import posts.signals  # connect signals
+
+        # Full-text index tables/triggers are not models, create them after migrate
+        post_migrate.connect(posts.signals.create_search_index_after_migrate, sender=self)
@@ -0,0 +1,112 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import MediaBlob
+
+
+# Reference counts of content-addressed media files (see posts.storage).
+# A file can be shared by any number of PostMedia / profile picture / derivative
+# references. Releasing the last reference does not delete the file right away:
+# collect_garbage() removes blobs that stayed unreferenced for a grace period,
+# so an identical upload arriving at the same moment can still claim it.
+
+
+def acquire_blob(name):
+    # +1 reference to a stored file
+    acquire_blobs([name])
+
+
+def acquire_blobs(names):
+    # +1 reference per occurrence in names, in two queries whatever their number
+
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, size=_size(name)) for name in counts],
+        ignore_conflicts=True
+    )
+
+    # Usually every name occurs once -> a single UPDATE
+    by_count = {}
+    for name, count in counts.items():
+        by_count.setdefault(count, []).append(name)
+
+    for count, group in by_count.items():
+        MediaBlob.objects.filter(name__in=group).update(
+            ref_count=F('ref_count') + count,
+            updated_at=timezone.now()
+        )
+
+
+def touch_blob(name, size=0):
+    # Called by the storage before it reuses or writes a file: restarts the blob's
+    # grace period so collect_garbage() cannot delete the file in the window before
+    # the new reference is acquired (acquire_blobs runs later, often at commit).
+    # The UPDATE waits for a collect_garbage() that is deleting this blob; the row
+    # is then gone and the storage finds the file missing and writes it again.
+
+    if not MediaBlob.objects.filter(name=name).update(updated_at=timezone.now()):
+        MediaBlob.objects.bulk_create([MediaBlob(name=name, size=size)], ignore_conflicts=True)
+
+
+def release_blob(name):
+    # -1 reference, the file itself is removed later by collect_garbage()
+
+    if not name:
+        return
+
+    MediaBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1,
+        updated_at=timezone.now()
+    )
+
+
+def discard_files(names):
+    # Files written for a write that was rolled back. They may be shared blobs,
+    # so instead of deleting them here they are left to collect_garbage()
+
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, size=_size(name)) for name in set(names)],
+        ignore_conflicts=True
+    )
+
+
+def collect_garbage(grace=None, storage=default_storage):
+    # Delete files whose blob has had no references for longer than the grace period
+
+    if grace is None:
+        grace = timedelta(minutes=settings.MEDIA_BLOB_GC_GRACE_MINUTES)
+
+    cutoff = timezone.now() - grace
+    names = list(
+        MediaBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('name', flat=True)
+    )
+
+    deleted = 0
+    for name in names:
+        # Re-checked in the DELETE: a reference or touch_blob() since the read keeps the
+        # file. The row stays locked until the file is gone, so a concurrent save of
+        # the same content waits and then stores the file again.
+        with transaction.atomic():
+            removed, _ = MediaBlob.objects.filter(name=name, ref_count=0, updated_at__lt=cutoff).delete()
+
+            if removed:
+                storage.delete(name)
+                deleted += 1
+
+    return deleted
+
+
+def _size(name):
+    try:
+        return default_storage.size(name)
+    except OSError:
+        return 0
@@ -0,0 +1,163 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from posts.models import Post, PostCounterShard, PostLike, Comment
+
+
+# Contention-safe like/comment counters.
+# Every change is an atomic F() increment on one of POST_COUNTER_SHARDS rows picked at
+# random, so writers on the same post rarely touch the same row. Post.like_count and
+# Post.comment_count hold the folded totals; Post.total_likes / total_comments add the
+# pending shard deltas on read.
+
+
+def add_to_counters(post_id, likes=0, comments=0):
+    # Atomically add deltas (may be negative) to a random shard of the post
+
+    if not likes and not comments:
+        return
+
+    shard = random.randrange(settings.POST_COUNTER_SHARDS)
+    shard_row = PostCounterShard.objects.filter(post_id=post_id, shard=shard)
+
+    updated = shard_row.update(
+        likes=F('likes') + likes,
+        comments=F('comments') + comments
+    )
+
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            PostCounterShard.objects.create(
+                post_id=post_id,
+                shard=shard,
+                likes=likes,
+                comments=comments
+            )
+    except IntegrityError:
+        # Shard row was created concurrently, increment it instead
+        shard_row.update(
+            likes=F('likes') + likes,
+            comments=F('comments') + comments
+        )
+
+
+def add_many_to_counters(deltas):
+    # {post_id: (likes, comments)} applied to one random shard per post in a single
+    # upsert per batch: a new shard row is inserted, an existing one is incremented
+
+    rows = [
+        (post_id, random.randrange(settings.POST_COUNTER_SHARDS), likes, comments)
+        for post_id, (likes, comments) in deltas.items()
+        if likes or comments
+    ]
+
+    table = PostCounterShard._meta.db_table
+    batch_size = settings.TIMELINE_BATCH_SIZE
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (post_id, shard, likes, comments)
+                VALUES {', '.join(['(%s, %s, %s, %s)'] * len(batch))}
+                ON CONFLICT (post_id, shard) DO UPDATE SET
+                    likes = {table}.likes + excluded.likes,
+                    comments = {table}.comments + excluded.comments
+                """,
+                [value for row in batch for value in row]
+            )
+
+
+def fold_counter_shards(batch_size=1000):
+    # Move pending shard deltas into the Post columns. Returns number of posts updated.
+    # Batches are cut by post, so every shard of a post is folded in the same transaction.
+
+    folded_posts = 0
+    last_post_id = 0
+
+    while True:
+        post_ids = list(
+            PostCounterShard.objects.filter(post_id__gt=last_post_id).order_by('post_id').values_list(
+                'post_id', flat=True
+            ).distinct()[:batch_size]
+        )
+
+        if not post_ids:
+            return folded_posts
+
+        with transaction.atomic():
+            shards = list(
+                PostCounterShard.objects.select_for_update().filter(post_id__in=post_ids).values_list(
+                    'id', 'post_id', 'likes', 'comments'
+                )
+            )
+
+            totals = defaultdict(lambda: [0, 0])
+            for _, post_id, likes, comments in shards:
+                totals[post_id][0] += likes
+                totals[post_id][1] += comments
+
+            for post_id, (likes, comments) in totals.items():
+                Post.objects.filter(pk=post_id).update(
+                    like_count=F('like_count') + likes,
+                    comment_count=F('comment_count') + comments
+                )
+
+            # Delete only the rows that were folded, newer ones stay pending
+            PostCounterShard.objects.filter(id__in=[shard[0] for shard in shards]).delete()
+
+        folded_posts += len(totals)
+        last_post_id = post_ids[-1]
+
+
+def recompute_counters(batch_size=1000):
+    # Recompute counters from PostLike / Comment rows, one batch of posts at a time.
+    # Also moves the comment sequence past any existing comment_number.
+    # Returns number of posts processed.
+
+    likes = PostLike.objects.filter(
+        post=OuterRef('pk')
+    ).values('post').annotate(total=Count('*')).values('total')
+
+    # Comments hidden by a pending purge job are not counted
+    comments = Comment.objects.filter(
+        post=OuterRef('pk'),
+        comment_number__gt=OuterRef('comments_hidden_upto')
+    ).values('post').annotate(total=Count('*')).values('total')
+
+    max_number = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).values('post').annotate(number=Max('comment_number')).values('number')
+
+    last_id = 0
+    processed = 0
+
+    while True:
+        post_ids = list(
+            Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+
+        if not post_ids:
+            return processed
+
+        with transaction.atomic():
+            PostCounterShard.objects.filter(post_id__in=post_ids).delete()
+
+            Post.objects.filter(id__in=post_ids).update(
+                like_count=Coalesce(Subquery(likes), 0),
+                comment_count=Coalesce(Subquery(comments), 0),
+                last_comment_number=Greatest(F('last_comment_number'), Coalesce(Subquery(max_number), 0))
+            )
+
+        last_id = post_ids[-1]
+        processed += len(post_ids)
@@ -0,0 +1,170 @@
+import logging
+import math
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from posts.blobs import acquire_blob, release_blob
+from posts.models import Post, PostMedia
+
+logger = logging.getLogger(__name__)
+
+
+# Responsive image derivatives for PostMedia.
+# Every image gets downscaled copies (MEDIA_DERIVATIVE_WIDTHS) stored next to the
+# original, plus a BlurHash placeholder the client can paint before any download.
+# Runs on the background worker pool, never on the request path.
+
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def generate_derivatives(media_id):
+    # Build derivatives + placeholder for one PostMedia row
+
+    media = PostMedia.objects.filter(pk=media_id, media_type='IMAGE').first()
+    if media is None:
+        return
+
+    try:
+        with media.file.open('rb'):
+            image = Image.open(media.file)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        logger.warning("Could not read image of PostMedia %s", media_id)
+        return
+
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    image_format = settings.MEDIA_DERIVATIVE_FORMAT
+    if has_alpha and image_format == 'JPEG':
+        image_format = 'PNG'
+
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    # Named in the field's upload directory: the original's own path is already sharded
+    root = os.path.join(
+        media.file.field.upload_to,
+        os.path.splitext(os.path.basename(media.file.name))[0]
+    )
+    storage = media.file.storage
+    derivatives = {}
+
+    for width in sorted(settings.MEDIA_DERIVATIVE_WIDTHS):
+        # Never upscale
+        if width >= image.width:
+            break
+
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        resized.save(buffer, format=image_format, quality=settings.MEDIA_DERIVATIVE_QUALITY)
+
+        name = f"{root}_{width}w.{FORMAT_EXTENSIONS[image_format]}"
+        derivatives[str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+        acquire_blob(derivatives[str(width)])
+
+    placeholder = blurhash(image)
+
+    updated = PostMedia.objects.filter(pk=media.pk).update(
+        derivatives=derivatives,
+        placeholder=placeholder
+    )
+
+    if not updated:
+        # Media was deleted while we were working
+        release_derivatives(derivatives)
+        return
+
+    # Regenerated: drop the references of the previous copies
+    release_derivatives(media.derivatives)
+
+    # The post's serialized form changed (new srcset)
+    Post.objects.filter(pk=media.post_id).update(updated_at=timezone.now())
+
+
+def release_derivatives(derivatives):
+    # Derivatives are content-addressed blobs too, possibly shared with other media
+    for name in derivatives.values():
+        release_blob(name)
+
+
+def blurhash(image, x_components=4, y_components=3):
+    # BlurHash (https://blurha.sh) of an RGB(A) image, computed on a 32x32 copy
+
+    small = image.convert('RGB').resize((32, 32), Image.Resampling.BILINEAR)
+    width, height = small.size
+    pixels = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in small.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+
+            for y in range(height):
+                basis_y = math.cos(math.pi * j * y / height)
+                row = pixels[y * width:(y + 1) * width]
+
+                for x, (pr, pg, pb) in enumerate(row):
+                    basis = basis_y * math.cos(math.pi * i * x / width)
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = int(max(0, min(82, math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _base83(0, 1)
+
+    dc_value = (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2])
+    result += _base83(dc_value, 4)
+
+    for factor in ac:
+        quant = [
+            int(max(0, min(18, math.floor(_sign_pow(value / max_value, 0.5) * 9 + 9.5))))
+            for value in factor
+        ]
+        result += _base83(quant[0] * 19 * 19 + quant[1] * 19 + quant[2], 2)
+
+    return result
+
+
+def _base83(value, length):
+    return ''.join(
+        BASE83[(value // 83 ** (length - i - 1)) % 83]
+        for i in range(length)
+    )
+
+
+def _srgb_to_linear(value):
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
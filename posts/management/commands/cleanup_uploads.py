@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import MediaUpload
+from posts.uploads import delete_upload
+
+
+class Command(BaseCommand):
+
+    # Remove chunked upload sessions that were never attached to a post, and their temp files.
+    # Usage: python manage.py cleanup_uploads [--hours 24]
+
+    help = "Delete abandoned chunked upload sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.UPLOAD_SESSION_EXPIRY_HOURS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+
+        uploads = MediaUpload.objects.filter(
+            updated_at__lt=cutoff
+        ).exclude(status='attached')
+
+        total = 0
+        for upload in uploads.iterator():
+            delete_upload(upload)
+            total += 1
+
+        # Attached sessions only keep their row for the client's reference
+        MediaUpload.objects.filter(status='attached', updated_at__lt=cutoff).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} abandoned upload(s)."))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+
+    # Delete media files no post or profile references anymore.
+    # Usage: python manage.py gc_media_blobs [--grace-minutes 60]
+
+    help = "Delete unreferenced content-addressed media files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=settings.MEDIA_BLOB_GC_GRACE_MINUTES)
+
+    def handle(self, *args, **options):
+        deleted = collect_garbage(grace=timedelta(minutes=options['grace_minutes']))
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced file(s)."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.derivatives import generate_derivatives
+from posts.models import PostMedia
+
+
+class Command(BaseCommand):
+
+    # Build thumbnails/srcset for images uploaded before derivatives existed.
+    # Usage: python manage.py generate_media_derivatives [--all]
+
+    help = "Generate responsive derivatives and placeholders for post images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenerate images that already have derivatives.")
+
+    def handle(self, *args, **options):
+        media = PostMedia.objects.filter(media_type='IMAGE')
+
+        if not options['all']:
+            media = media.filter(placeholder='')
+
+        total = 0
+        for media_id in media.values_list('id', flat=True).iterator():
+            generate_derivatives(media_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} image(s)."))
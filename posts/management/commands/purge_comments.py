@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import CommentPurgeJob
+from posts.purge import run_comment_purge
+
+
+class Command(BaseCommand):
+
+    # Resume "delete all comments" jobs that did not finish (e.g. after a restart).
+    # Usage: python manage.py purge_comments
+
+    help = "Run pending, interrupted or failed comment purge jobs."
+
+    def handle(self, *args, **options):
+        jobs = CommentPurgeJob.objects.exclude(status='done').order_by('created_at')
+
+        total = 0
+        for job in jobs:
+            run_comment_purge(job.id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Finished {total} comment purge job(s)."))
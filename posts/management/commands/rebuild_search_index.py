@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import create_search_index
+
+
+class Command(BaseCommand):
+
+    # Create the full-text index (if missing) and reindex every post and comment.
+    # Usage: python manage.py rebuild_search_index
+
+    help = "Rebuild the FTS5 full-text index of posts and comments."
+
+    def handle(self, *args, **options):
+        if not create_search_index(rebuild=True):
+            self.stdout.write(self.style.WARNING("Full-text search needs SQLite with FTS5, nothing to do."))
+            return
+
+        self.stdout.write(self.style.SUCCESS("Rebuilt the full-text index."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild_timeline
+from users.models import User
+
+
+class Command(BaseCommand):
+
+    # Rebuild materialized feed timelines, e.g. after deploying them on existing data.
+    # Usage: python manage.py rebuild_timelines [--user <username> ...]
+
+    help = "Rebuild materialized feed timelines from posts and friendships."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help="Only rebuild the timeline of this username (can be repeated)."
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all().order_by('id')
+
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        total = 0
+        for user in users.iterator():
+            rebuild_timeline(user)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} timeline(s)."))
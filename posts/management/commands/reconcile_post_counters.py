@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import fold_counter_shards, recompute_counters
+
+
+class Command(BaseCommand):
+
+    # Keeps Post.like_count / comment_count correct.
+    # Usage:
+    #   python manage.py reconcile_post_counters              -> recompute from likes/comments
+    #   python manage.py reconcile_post_counters --fold-only  -> only fold pending shard deltas (cheap, for cron)
+
+    help = "Recompute or fold denormalized like/comment counters on posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fold-only',
+            action='store_true',
+            help="Only fold pending counter shards into the posts."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Rows processed per transaction."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['fold_only']:
+            total = fold_counter_shards(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Folded counters of {total} post(s)."))
+            return
+
+        total = recompute_counters(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed counters of {total} post(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import refresh_trending
+
+
+class Command(BaseCommand):
+
+    # Recompute the trending posts table. Run it periodically (e.g. every 5 minutes from cron).
+    # Usage: python manage.py refresh_trending
+
+    help = "Recompute time-decayed trending scores of public posts."
+
+    def handle(self, *args, **options):
+        total = refresh_trending()
+
+        self.stdout.write(self.style.SUCCESS(f"Ranked {total} trending post(s)."))
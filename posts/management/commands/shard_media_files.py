@@ -0,0 +1,125 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.blobs import acquire_blobs, discard_files, release_blob
+from posts.models import MediaBlob, PostMedia
+from profiles.models import Profile
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+
+    # Move media files stored in the old flat layout (post_media/<name>) into the
+    # sharded content-addressed layout (post_media/ab/cd/<sha256><ext>).
+    # Runs online: each file is copied first, rows are repointed in small batches
+    # with a conditional UPDATE, and the old file is left to gc_media_blobs, so
+    # requests still holding the old URL keep working for the grace period.
+    # Usage: python manage.py shard_media_files [--batch-size 500]
+
+    help = "Migrate media files into the sharded content-addressed layout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # old name -> new name, so a file shared by many rows is copied once
+        self.moved = {}
+
+        fields = (
+            (PostMedia, 'file'),
+            (get_user_model(), 'profile_picture'),
+            (Profile, 'profile_picture'),
+        )
+
+        total = 0
+        for model, field in fields:
+            total += self.migrate_field(model, field, batch_size)
+
+        total += self.migrate_derivatives(batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Moved {total} file reference(s) to the sharded layout."))
+
+    def migrate_field(self, model, field, batch_size):
+        migrated = 0
+
+        queryset = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+
+        for rows in self.batches(queryset, ('pk', field), batch_size):
+            with transaction.atomic():
+                for pk, name in rows:
+                    new_name = self.migrate_name(name)
+                    if new_name is None:
+                        continue
+
+                    # Skip rows whose file changed since they were read
+                    if model.objects.filter(pk=pk, **{field: name}).update(**{field: new_name}):
+                        acquire_blobs([new_name])
+                        self.retire(name)
+                        migrated += 1
+
+        return migrated
+
+    def migrate_derivatives(self, batch_size):
+        migrated = 0
+
+        for rows in self.batches(PostMedia.objects.filter(media_type='IMAGE'), ('pk', 'derivatives'), batch_size):
+            with transaction.atomic():
+                for pk, derivatives in rows:
+                    moved = {width: self.migrate_name(name) for width, name in derivatives.items()}
+
+                    if any(new_name is None for new_name in moved.values()) or moved == derivatives:
+                        continue
+
+                    PostMedia.objects.filter(pk=pk).update(derivatives=moved)
+
+                    changed = [width for width in derivatives if derivatives[width] != moved[width]]
+                    acquire_blobs([moved[width] for width in changed])
+                    for width in changed:
+                        self.retire(derivatives[width])
+
+                    migrated += len(changed)
+
+        return migrated
+
+    def batches(self, queryset, fields, batch_size):
+        # Keyset walk over pk, one short transaction per batch
+        last_pk = 0
+
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(*fields)[:batch_size])
+            if not rows:
+                return
+
+            last_pk = rows[-1][0]
+            yield rows
+
+    def migrate_name(self, name):
+        # Sharded name of a stored file, copying it there on first sight
+
+        if default_storage.is_blob_name(name):
+            return name
+
+        if name not in self.moved:
+            try:
+                with default_storage.open(name, 'rb') as old_file:
+                    self.moved[name] = default_storage.save(name, old_file)
+            except FileNotFoundError:
+                logger.warning("Media file %s is missing, row left unchanged", name)
+                self.moved[name] = None
+
+        return self.moved[name]
+
+    def retire(self, name):
+        # Tracked blobs lose one reference; untracked files (stored before
+        # content addressing) are registered as unreferenced blobs
+        if MediaBlob.objects.filter(name=name).exists():
+            release_blob(name)
+        else:
+            discard_files([name])
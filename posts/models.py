@@ -1,6 +1,9 @@
-from django.db import models
+import os
+import uuid
+
+from django.db import models, transaction
 from django.conf import settings
-from django.db.models import Max
+from django.db.models import F, Q
 
 # Create your models here.
 
@@ -31,16 +34,128 @@ class Post(models.Model):
         default='FRIENDS'
     )
 
+    # Denormalized engagement counters. Writes go to PostCounterShard rows first
+    # (see posts.counters) and are folded in here periodically.
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Per-post comment sequence: highest comment_number handed out so far
+    last_comment_number = models.PositiveIntegerField(default=0, editable=False)
+
+    # Comments numbered up to this are hidden, waiting for a background purge
+    comments_hidden_upto = models.PositiveIntegerField(default=0, editable=False)
+
+    # False when the author had too many friends to push the post into every
+    # friend's timeline; such posts are pulled at read time instead (fan-out-on-read)
+    is_fanned_out = models.BooleanField(default=True)
+
     # Timestamp fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']  # Newest posts first
+        indexes = [
+            # Covers feed keyset pagination: author IN (...) ORDER BY created_at, id
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+            # Small partial index for posts pulled at read time
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                condition=Q(is_fanned_out=False),
+                name='post_pull_author_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username} ({self.visibility})"
 
+    # Folded count plus deltas still pending in counter shards.
+    # Prefetch 'counter_shards' when reading many posts.
+
+    @property
+    def total_likes(self):
+        return self.like_count + sum(shard.likes for shard in self.counter_shards.all())
+
+    @property
+    def total_comments(self):
+        return self.comment_count + sum(shard.comments for shard in self.counter_shards.all())
+
+class PostCounterShard(models.Model):
+
+    # Pending like/comment deltas of a post, spread over a few rows so concurrent
+    # likes on a viral post don't all wait on the same row lock.
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='counter_shards'
+    )
+
+    shard = models.PositiveSmallIntegerField()
+
+    likes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'shard')
+
+    def __str__(self):
+        return f"Post {self.post_id} shard {self.shard}"
+
+class TimelineEntry(models.Model):
+
+    # Materialized feed row (fan-out-on-write): "post belongs to owner's timeline".
+    # Filled when a post is created and when a friendship is accepted, pruned on unfriend.
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+
+    # Copy of post.created_at so the feed is one index range on (owner, post_created_at)
+    post_created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(fields=['owner', '-post_created_at', '-post'], name='timeline_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in timeline of user {self.owner_id}"
+
+class TrendingPost(models.Model):
+
+    # Ranked PUBLIC posts for the trending endpoint, rebuilt by posts.trending.refresh_trending.
+    # Reading a page is one range scan on (score, post).
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending'
+    )
+
+    # Time-decayed engagement score
+    score = models.FloatField()
+
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} trending ({self.score:.2f})"
+
 class PostMedia(models.Model):
 
     # Stores media files (images/videos) related to a Post. Supports multiple media per post (carousel style).
@@ -68,6 +183,12 @@ class PostMedia(models.Model):
         upload_to='post_media/'
     )
 
+    # Downscaled copies {width: storage name}, filled in the background (posts.derivatives)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
+    # BlurHash shown while the image loads
+    placeholder = models.CharField(max_length=64, blank=True, editable=False)
+
     # Timestamp
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -77,6 +198,67 @@ class PostMedia(models.Model):
     def __str__(self):
         return f"{self.media_type} for Post {self.post.id}"
 
+class MediaBlob(models.Model):
+
+    # One content-addressed media file (see posts.storage) and how many rows use it.
+    # Unreferenced blobs are deleted by posts.blobs.collect_garbage.
+
+    # Storage name, e.g. post_media/<sha256>.jpg
+    name = models.CharField(max_length=255, unique=True)
+
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class MediaUpload(models.Model):
+
+    # Resumable chunked upload session (init -> PUT chunks -> finalize).
+    # Chunks are streamed into a temp file; a finalized upload is attached to a post by id.
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='media_uploads'
+    )
+
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+
+    # SHA-256 (hex) of the whole file: declared by the client, verified on finalize
+    sha256 = models.CharField(max_length=64, blank=True)
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{self.id}.part")
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.filename}, {self.status})"
+
 class PostLike(models.Model):
 
     # Represents a like made by a user on a post. One user can like a post only once.
@@ -98,10 +280,20 @@ class PostLike(models.Model):
     class Meta:
         # Prevent duplicate likes
         unique_together = ('post', 'user')
+        indexes = [
+            # Recent-likes range scan of the trending refresh
+            models.Index(fields=['created_at'], name='postlike_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} liked Post {self.post.id}"
 
+class CommentQuerySet(models.QuerySet):
+
+    def visible(self):
+        # Excludes comments hidden by a pending "delete all" job
+        return self.filter(comment_number__gt=F('post__comments_hidden_upto'))
+
 class Comment(models.Model):
 
     # Flat comment model, single user can comment multiple times on the same post.
@@ -125,22 +317,77 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['comment_number']
         unique_together = ('post', 'comment_number')
+        indexes = [
+            # Recent-comments range scan of the trending refresh
+            models.Index(fields=['created_at'], name='comment_created_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Only generate if not already set
         if self._state.adding:
-            last_number = Comment.objects.filter(
-                post=self.post
-            ).aggregate(
-                Max('comment_number')
-            )['comment_number__max']
-
-            self.comment_number = (last_number or 0) + 1
+            with transaction.atomic():
+                # Bump the post's sequence in one atomic UPDATE. The row lock it takes is held
+                # until commit, so concurrent commenters get distinct numbers in O(1).
+                Post.objects.filter(pk=self.post_id).update(
+                    last_comment_number=F('last_comment_number') + 1
+                )
+                self.comment_number = Post.objects.filter(
+                    pk=self.post_id
+                ).values_list('last_comment_number', flat=True).get()
+
+                super().save(*args, **kwargs)
+            return
 
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.post.id}-{self.comment_number}"
\ No newline at end of file
+        return f"{self.post.id}-{self.comment_number}"
+
+class CommentPurgeJob(models.Model):
+
+    # Background "delete all comments" of a post. The comments are hidden right away
+    # (Post.comments_hidden_upto) and the rows are deleted in small batches.
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='comment_purge_jobs'
+    )
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='comment_purge_jobs'
+    )
+
+    # Every comment of the post numbered up to this is deleted
+    upto_number = models.PositiveIntegerField()
+
+    total_comments = models.PositiveIntegerField(default=0)
+    deleted_comments = models.PositiveIntegerField(default=0)
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Comment purge {self.id} of Post {self.post_id} ({self.status})"
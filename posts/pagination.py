@@ -0,0 +1,204 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+
+
+class KeysetPaginator:
+    # Opaque cursor (keyset) pagination.
+    # Instead of OFFSET, every page is read with a WHERE on the ordering key of the
+    # last row seen, so page N costs the same index range scan as page 1.
+    # The ordering must end with a unique field (e.g. 'id') to be a total order.
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, request, ordering=('-created_at', '-id'), page_size=None, max_page_size=None, model=None):
+        self.request = request
+        # Model the ordering fields belong to, used to validate cursor values
+        # (taken from the first queryset in paginate() when not given)
+        self.model = model
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+        default_size = page_size or settings.FEED_PAGE_SIZE
+        max_size = max_page_size or settings.FEED_MAX_PAGE_SIZE
+        self.page_size = self.get_page_size(default_size, max_size)
+
+        self.next_cursor = None
+        self.prev_cursor = None
+
+    def get_page_size(self, default_size, max_size):
+        # Client may ask for a smaller/larger page, capped by max_size
+        try:
+            size = int(self.request.query_params.get(self.page_size_query_param, default_size))
+        except (TypeError, ValueError):
+            return default_size
+
+        return max(1, min(size, max_size))
+
+    def paginate(self, *querysets):
+        # Returns the rows of the requested page (in display order).
+        # Several querysets sharing the same ordering fields can be merged into one page.
+
+        if self.model is None:
+            self.model = querysets[0].model
+
+        direction, position = self.decode_cursor(
+            self.request.query_params.get(self.cursor_query_param)
+        )
+        forward = direction == 'next'
+
+        if forward:
+            ordering = self.ordering
+        else:
+            # Walk backwards by flipping the ordering, then reverse the rows
+            ordering = [self._flip(field) for field in self.ordering]
+
+        rows = []
+
+        for queryset in querysets:
+            if position is not None:
+                queryset = queryset.filter(self.build_filter(position, forward))
+
+            rows.extend(queryset.order_by(*ordering)[:self.page_size + 1])
+
+        if len(querysets) > 1:
+            self.sort_rows(rows, ordering)
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return rows
+
+        if forward:
+            self.next_cursor = self.encode_cursor('next', rows[-1]) if has_more else None
+            self.prev_cursor = self.encode_cursor('prev', rows[0]) if position is not None else None
+        else:
+            self.prev_cursor = self.encode_cursor('prev', rows[0]) if has_more else None
+            self.next_cursor = self.encode_cursor('next', rows[-1])
+
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_cursor,
+            'prev': self.prev_cursor,
+            'results': data,
+        })
+
+    def build_filter(self, position, forward):
+        # Lexicographic "after this row" filter, e.g. for ('-created_at', '-id'):
+        # created_at < c OR (created_at = c AND id < i)
+
+        condition = Q()
+        equal = {}
+
+        for field, ordering, value in zip(self.fields, self.ordering, position):
+            descending = ordering.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+
+        return condition
+
+    def sort_rows(self, rows, ordering):
+        # Stable sort, least significant field first
+        for field in reversed(ordering):
+            name = field.lstrip('-')
+            rows.sort(key=lambda obj: self._get_value(obj, name), reverse=field.startswith('-'))
+
+    def get_position(self, obj):
+        position = []
+
+        for field in self.fields:
+            value = self._get_value(obj, field)
+
+            if isinstance(value, datetime):
+                value = value.isoformat()
+
+            position.append(value)
+
+        return position
+
+    def encode_cursor(self, direction, obj):
+        payload = json.dumps({'d': direction, 'p': self.get_position(obj)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        # No cursor -> first page
+
+        if not cursor:
+            return 'next', None
+
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction = payload['d']
+            position = payload['p']
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise ParseError("Invalid cursor.")
+
+        if direction not in ('next', 'prev') or not isinstance(position, list) \
+                or len(position) != len(self.fields):
+            raise ParseError("Invalid cursor.")
+
+        try:
+            position = [self.to_python(field, value) for field, value in zip(self.fields, position)]
+        except (ValidationError, ValueError, TypeError):
+            raise ParseError("Invalid cursor.")
+
+        return direction, position
+
+    def to_python(self, field, value):
+        # Cursor value converted by the model field it orders on, so a tampered
+        # cursor is rejected here instead of failing in the query
+
+        if value is None or isinstance(value, (bool, list, dict)):
+            raise ValueError(value)
+
+        model_field = self._get_model_field(field)
+
+        if model_field is None:
+            # Annotation (e.g. a search rank): plain numbers only
+            if not isinstance(value, (int, float)):
+                raise ValueError(value)
+            return value
+
+        return model_field.to_python(value)
+
+    def _get_model_field(self, field):
+        model = self.model
+        if model is None:
+            return None
+
+        model_field = None
+        try:
+            for name in field.split('__'):
+                model_field = model._meta.get_field(name)
+                model = model_field.related_model
+        except (FieldDoesNotExist, AttributeError):
+            return None
+
+        return model_field
+
+    @staticmethod
+    def _get_value(obj, field):
+        for attr in field.split('__'):
+            obj = getattr(obj, attr)
+        return obj
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
@@ -0,0 +1,30 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from posts.models import Comment
+
+
+def attach_comment_previews(posts, limit):
+    # Attach the latest `limit` comments of every post as post.comment_preview,
+    # using one windowed query for the whole page instead of one query per post.
+
+    previews = {post.id: [] for post in posts}
+
+    if previews and limit > 0:
+        comments = Comment.objects.visible().filter(
+            post_id__in=previews.keys()
+        ).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('post_id')],
+                order_by=F('comment_number').desc()
+            )
+        ).filter(
+            position__lte=limit
+        ).select_related('author').order_by('post_id', 'comment_number')
+
+        for comment in comments:
+            previews[comment.post_id].append(comment)
+
+    for post in posts:
+        post.comment_preview = previews[post.id]
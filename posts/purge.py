@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from posts.counters import add_to_counters
+from posts.models import Post, Comment, CommentPurgeJob
+from Social_Media_app.tasks import run_in_background
+
+
+# Background "delete all comments" of a post.
+# The request only moves Post.comments_hidden_upto (one row update, comments disappear
+# immediately) and records a job; the rows are then deleted COMMENT_PURGE_BATCH_SIZE
+# at a time so no single write transaction stays open for long.
+
+
+def start_comment_purge(post, user):
+    # Hide all current comments of the post and schedule their deletion
+
+    with transaction.atomic():
+        # Lock the post so no comment number is handed out while we pick the cutoff
+        post = Post.objects.select_for_update().get(pk=post.pk)
+        upto_number = post.last_comment_number
+
+        comments = Comment.objects.filter(post=post, comment_number__lte=upto_number)
+        visible_count = comments.filter(comment_number__gt=post.comments_hidden_upto).count()
+
+        Post.objects.filter(pk=post.pk).update(comments_hidden_upto=upto_number)
+        add_to_counters(post.id, comments=-visible_count)
+
+        job = CommentPurgeJob.objects.create(
+            post=post,
+            requested_by=user,
+            upto_number=upto_number,
+            total_comments=comments.count()
+        )
+
+        run_in_background(run_comment_purge, job.id)
+
+    return job
+
+
+def run_comment_purge(job_id):
+    # Delete the hidden comments of a job in bounded batches, recording progress
+
+    job = CommentPurgeJob.objects.get(pk=job_id)
+
+    if job.status == 'done':
+        return
+
+    CommentPurgeJob.objects.filter(pk=job.pk).update(status='running')
+
+    comments = Comment.objects.filter(
+        post_id=job.post_id,
+        comment_number__lte=job.upto_number
+    )
+
+    try:
+        while True:
+            batch_ids = list(
+                comments.order_by('comment_number').values_list('id', flat=True)[:settings.COMMENT_PURGE_BATCH_SIZE]
+            )
+
+            if not batch_ids:
+                break
+
+            with transaction.atomic():
+                deleted, _ = Comment.objects.filter(id__in=batch_ids).delete()
+
+            CommentPurgeJob.objects.filter(pk=job.pk).update(
+                deleted_comments=F('deleted_comments') + deleted
+            )
+    except Exception:
+        CommentPurgeJob.objects.filter(pk=job.pk).update(status='failed')
+        raise
+
+    CommentPurgeJob.objects.filter(pk=job.pk).update(status='done')
@@ -0,0 +1,142 @@
+import logging
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from posts.models import Post
+from posts.visibility import filter_visible
+
+logger = logging.getLogger(__name__)
+
+
+# Full-text search over post and comment content (SQLite FTS5).
+# Each table gets an external-content FTS5 index (no copy of the text) kept in sync
+# by SQLite triggers, so creates, edits, cascades and bulk deletes all update it
+# without any Python-side work. The index is created after migrate (see
+# posts.apps) and can be rebuilt with the rebuild_search_index command.
+# On other database backends search falls back to icontains.
+
+INDEXED_TABLES = {
+    # FTS table -> content table
+    'posts_post_fts': 'posts_post',
+    'posts_comment_fts': 'posts_comment',
+}
+
+
+def _table_sql(fts_table, table):
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            content, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table}(rowid, content) VALUES (new.id, new.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, content) VALUES ('delete', old.id, old.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF content ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO {fts_table}(rowid, content) VALUES (new.id, new.content);
+        END""",
+    ]
+
+
+@lru_cache
+def search_available(using=DEFAULT_DB_ALIAS):
+    # SQLite built with FTS5
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, rebuild=False):
+    # Create the FTS tables and triggers if missing; rebuild=True reindexes all rows
+
+    if not search_available(using):
+        return False
+
+    with connections[using].cursor() as cursor:
+        for fts_table, table in INDEXED_TABLES.items():
+            for statement in _table_sql(fts_table, table):
+                cursor.execute(statement)
+
+            if rebuild:
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+    return True
+
+
+def fts_query(text):
+    # User input -> safe FTS5 query: every word must match, the last one as a prefix
+    terms = re.findall(r'\w+', text)[:settings.SEARCH_MAX_TERMS]
+
+    if not terms:
+        return None
+
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def match(fts_table, text, after=None, limit=None):
+    # [(id, rank)] best first (bm25), starting after an (rank, id) position
+
+    query = fts_query(text)
+    if query is None:
+        return []
+
+    sql = f"SELECT rowid, rank FROM {fts_table} WHERE {fts_table} MATCH %s"
+    params = [query]
+
+    if after is not None:
+        sql += " AND (rank > %s OR (rank = %s AND rowid > %s))"
+        params += [after[0], after[0], after[1]]
+
+    sql += " ORDER BY rank, rowid LIMIT %s"
+    params.append(limit or settings.SEARCH_MAX_RESULTS)
+
+    try:
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    except OperationalError:
+        # Index not created yet
+        logger.warning("Full-text index %s is missing, run rebuild_search_index", fts_table)
+        return []
+
+
+def search_posts(user, text, after=None, limit=20):
+    # Up to limit + 1 posts matching text that the user may see, best first.
+    # Candidates are read from the index in batches and visibility-filtered
+    # until the page is full.
+
+    posts = []
+    batch_size = max(limit + 1, settings.SEARCH_BATCH_SIZE)
+
+    while len(posts) <= limit:
+        candidates = match('posts_post_fts', text, after=after, limit=batch_size)
+        if not candidates:
+            break
+
+        visible = filter_visible(
+            Post.objects.filter(id__in=[post_id for post_id, _ in candidates]),
+            user
+        ).select_related('author').in_bulk()
+
+        for post_id, rank in candidates:
+            post = visible.get(post_id)
+            if post is not None:
+                post.search_rank = rank
+                posts.append(post)
+
+        after = (candidates[-1][1], candidates[-1][0])
+
+        if len(candidates) < batch_size:
+            break
+
+    return posts[:limit + 1]
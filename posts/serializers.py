@@ -1,15 +1,29 @@
 from rest_framework import serializers
 
-from posts.models import PostMedia, Post, Comment
+from posts.models import PostMedia, Post, Comment, CommentPurgeJob
 
 
 class PostMediaSerializer(serializers.ModelSerializer):
     # Serializer for individual media files (image/video)
 
+    # Downscaled image URLs by width, e.g. {"320w": ..., "640w": ...}. Empty until generated
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = PostMedia
-        fields = ['id', 'media_type', 'file', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'media_type', 'file', 'srcset', 'placeholder', 'created_at']
+        read_only_fields = ['id', 'srcset', 'placeholder', 'created_at']
+
+    def get_srcset(self, obj):
+        request = self.context.get('request')
+        storage = obj.file.storage
+
+        srcset = {}
+        for width, name in sorted(obj.derivatives.items(), key=lambda item: int(item[0])):
+            url = storage.url(name)
+            srcset[f"{width}w"] = request.build_absolute_uri(url) if request else url
+
+        return srcset
 
 class CommentSerializer(serializers.ModelSerializer):
 
@@ -24,7 +38,7 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['custom_id', 'author_name', 'created_at', 'updated_at']
 
     def get_custom_id(self, obj):
-        return f"{obj.post.id}-{obj.comment_number}"
+        return f"{obj.post_id}-{obj.comment_number}"
 
 class PostSerializer(serializers.ModelSerializer):
     # Main Post serializer with nested media and engagement counters.
@@ -32,8 +46,9 @@ class PostSerializer(serializers.ModelSerializer):
     # Nested media (read-only)
     media = PostMediaSerializer(many=True, read_only=True)
 
-    # Nested comments (read-only)
-    comments = CommentSerializer(many=True, read_only=True)
+    # Nested comments (read-only). Only the latest few when previews are attached
+    comments = serializers.SerializerMethodField()
+    has_more_comments = serializers.SerializerMethodField()
 
     # Author metadata
     author_name = serializers.CharField(source='author.username', read_only=True)
@@ -56,18 +71,41 @@ class PostSerializer(serializers.ModelSerializer):
             'likes_count',
             'comments_count',
             'comments',
+            'has_more_comments',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'author', 'likes_count', 'comments_count', 'comments', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'author', 'likes_count', 'comments_count', 'comments', 'has_more_comments',
+            'created_at', 'updated_at'
+        ]
 
     def get_likes_count(self, obj):
-        # Returns number of likes.
-        return obj.likes.count()
+        # Returns number of likes (denormalized counter, no COUNT query).
+        return obj.total_likes
 
     def get_comments_count(self, obj):
-        # Returns number of comments.
-        return obj.comments.count()
+        # Returns number of comments (denormalized counter, no COUNT query).
+        return obj.total_comments
+
+    def get_comments(self, obj):
+        # Preview mode: comments attached by posts.previews.attach_comment_previews
+        comments = getattr(obj, 'comment_preview', None)
+
+        if comments is None:
+            comments = obj.comments.filter(
+                comment_number__gt=obj.comments_hidden_upto
+            ).select_related('author')
+
+        return CommentSerializer(comments, many=True, context=self.context).data
+
+    def get_has_more_comments(self, obj):
+        comments = getattr(obj, 'comment_preview', None)
+
+        if comments is None:
+            return False
+
+        return obj.total_comments > len(comments)
 
     def validate(self, data):
         # Ensure post is not completely empty. Must contain text OR media.
@@ -81,4 +119,12 @@ class PostSerializer(serializers.ModelSerializer):
                 "Post must contain text or at least one media file."
             )
 
-        return data
\ No newline at end of file
+        return data
+
+class CommentPurgeJobSerializer(serializers.ModelSerializer):
+    # Progress of a background "delete all comments" job
+
+    class Meta:
+        model = CommentPurgeJob
+        fields = ['id', 'post', 'status', 'total_comments', 'deleted_comments', 'created_at', 'updated_at']
+        read_only_fields = fields
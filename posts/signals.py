@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts.blobs import acquire_blob, release_blob
+from posts.derivatives import generate_derivatives, release_derivatives
+from posts.models import PostMedia
+from posts.search import create_search_index
+from profiles.models import Profile
+from Social_Media_app.etags import bump_version
+from Social_Media_app.tasks import run_in_background
+
+
+@receiver(post_save, sender=PostMedia)
+def post_media_created(sender, instance, created, **kwargs):
+    if created:
+        acquire_blob(instance.file.name)
+
+        # Thumbnails/srcset are built off the request path
+        if instance.media_type == 'IMAGE':
+            run_in_background(generate_derivatives, instance.id)
+
+
+@receiver(post_delete, sender=PostMedia)
+def post_media_deleted(sender, instance, **kwargs):
+    release_blob(instance.file.name)
+    release_derivatives(instance.derivatives)
+
+
+# Profile pictures (User.profile_picture and Profile.profile_picture) share blobs too
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+@receiver(pre_save, sender=Profile)
+def remember_previous_values(sender, instance, update_fields=None, **kwargs):
+    # One lookup for the picture and, for users, the name/email shown in feeds.
+    # Saves that touch none of them (e.g. last_login) skip it.
+    fields = ['profile_picture'] if sender is Profile else ['profile_picture', 'username', 'email']
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+
+    if not fields:
+        return
+
+    previous = {}
+    if not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+
+    if 'profile_picture' in fields:
+        instance._previous_profile_picture = previous.get('profile_picture') or ''
+
+    identity = {field: previous[field] for field in ('username', 'email') if field in previous}
+    if identity:
+        instance._previous_identity = identity
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=Profile)
+def update_profile_picture_refs(sender, instance, **kwargs):
+    if not hasattr(instance, '_previous_profile_picture'):
+        return
+
+    previous = instance.__dict__.pop('_previous_profile_picture')
+    current = instance.profile_picture.name or ''
+
+    if current != previous:
+        acquire_blob(current)
+        release_blob(previous)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=Profile)
+def release_profile_picture(sender, instance, **kwargs):
+    release_blob(instance.profile_picture.name)
+
+
+def create_search_index_after_migrate(sender, using, **kwargs):
+    create_search_index(using)
+
+
+# Author names/emails are part of feed responses (posts and comment previews)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_identity_saved(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_previous_identity', None)
+
+    if previous and any(getattr(instance, field) != value for field, value in previous.items()):
+        bump_version('user-identity')
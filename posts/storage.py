@@ -0,0 +1,88 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Media storage that names every file by the SHA-256 of its content, fanned
+    # out into two levels of subdirectories so no directory grows past 65536 entries:
+    #     <upload_to>/ab/cd/<sha256><ext>     (ab, cd = first 4 hex digits)
+    # The content is hashed before anything is written (or its known SHA-256 is
+    # used, see posts.uploads.ChunkedUploadFile); if a file with the same hash
+    # already exists the existing name is returned without writing, so identical
+    # uploads share one file on disk. A missing blob is moved into place from the
+    # upload's temp file when there is one, otherwise written once.
+    # Rows referencing a file are counted in posts.MediaBlob.
+
+    blob_name_re = re.compile(r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(?:\.\w+)?$')
+
+    # Trailing "ab/cd" of a directory that is itself a shard
+    shard_dir_re = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}$')
+
+    def get_available_name(self, name, max_length=None):
+        # Names are decided by content in _save, never suffixed
+        return name
+
+    def blob_name(self, directory, digest, ext):
+        return os.path.join(directory, digest[:2], digest[2:4], f"{digest}{ext}").replace('\\', '/')
+
+    def is_blob_name(self, name):
+        # Already stored in the sharded layout
+        return bool(self.blob_name_re.search(name))
+
+    def content_sha256(self, content):
+        digest = getattr(content, 'sha256', None)
+        if digest:
+            return digest.lower()
+
+        # Read only, the content is written later if the blob is missing
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _save(self, name, content):
+        # A name derived from a stored blob (e.g. an image derivative) must not be sharded twice
+        directory = self.shard_dir_re.sub('', os.path.dirname(name).replace('\\', '/'))
+        ext = os.path.splitext(name)[1].lower()
+
+        blob_name = self.blob_name(directory, self.content_sha256(content), ext)
+        full_path = self.path(blob_name)
+
+        # Claim the blob before looking at the file, see posts.blobs.touch_blob
+        from posts.blobs import touch_blob
+        touch_blob(blob_name, content.size)
+
+        if os.path.exists(full_path):
+            # Same content already stored
+            return blob_name
+
+        full_directory = os.path.dirname(full_path)
+        os.makedirs(full_directory, exist_ok=True)
+
+        # Via a temp file in the target directory, so the blob appears complete or not at all
+        fd, temp_path = tempfile.mkstemp(dir=full_directory, suffix='.upload')
+
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), temp_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, 'wb') as temp_file:
+                    for chunk in content.chunks():
+                        temp_file.write(chunk)
+
+            os.replace(temp_path, full_path)
+
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return blob_name
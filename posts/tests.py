@@ -0,0 +1,594 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from friends.graph import friend_ids_query
+from friends.models import FriendRequest, Friendship
+from posts.counters import add_to_counters, fold_counter_shards
+from posts.blobs import collect_garbage
+from posts.models import MediaBlob, MediaUpload, Post, PostCounterShard, Comment, PostLike, TimelineEntry, TrendingPost
+from posts.storage import ContentAddressedStorage
+from posts.uploads import UploadError, claim_uploads, finalize_upload, media_from_upload, write_chunk
+from posts.visibility import can_interact, can_view, filter_visible
+from Social_Media_app.testing import QueryPlanTestMixin
+from users.models import User
+
+
+# Create your tests here.
+
+class CommentNumberingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="author@example.com", username="author")
+        self.post = Post.objects.create(author=self.user, content="Hello")
+
+    def test_numbers_are_sequential_per_post(self):
+        other_post = Post.objects.create(author=self.user, content="Other")
+
+        numbers = [
+            Comment.objects.create(post=self.post, author=self.user, content="a").comment_number,
+            Comment.objects.create(post=self.post, author=self.user, content="b").comment_number,
+            Comment.objects.create(post=other_post, author=self.user, content="c").comment_number,
+        ]
+
+        self.assertEqual(numbers, [1, 2, 1])
+
+    def test_numbers_are_not_reused_after_delete(self):
+        Comment.objects.create(post=self.post, author=self.user, content="a")
+        last = Comment.objects.create(post=self.post, author=self.user, content="b")
+        last.delete()
+
+        comment = Comment.objects.create(post=self.post, author=self.user, content="c")
+
+        self.assertEqual(comment.comment_number, 3)
+
+    def test_insert_cost_does_not_depend_on_thread_size(self):
+        for _ in range(20):
+            Comment.objects.create(post=self.post, author=self.user, content="x")
+
+        # UPDATE sequence, SELECT it, INSERT comment (+ savepoint handling)
+        with self.assertNumQueries(5):
+            Comment.objects.create(post=self.post, author=self.user, content="y")
+
+
+class CommentNumberingConcurrencyTests(TransactionTestCase):
+
+    # Burst of commenters on one hot post: every comment must be stored with a
+    # distinct, gap-free number and no request may fail on the unique constraint.
+
+    threads = 8
+    comments_per_thread = 10
+
+    def test_concurrent_comments_get_unique_numbers(self):
+        user = User.objects.create(email="author@example.com", username="author")
+        post = Post.objects.create(author=user, content="Hot post")
+
+        errors = []
+        start = threading.Barrier(self.threads)
+
+        def comment_burst():
+            try:
+                start.wait()
+                for _ in range(self.comments_per_thread):
+                    Comment.objects.create(post_id=post.id, author_id=user.id, content="+1")
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=comment_burst) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+
+        total = self.threads * self.comments_per_thread
+        numbers = sorted(Comment.objects.filter(post=post).values_list('comment_number', flat=True))
+
+        self.assertEqual(numbers, list(range(1, total + 1)))
+        post.refresh_from_db()
+        self.assertEqual(post.last_comment_number, total)
+
+
+class CounterFoldTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="author@example.com", username="author")
+        self.post = Post.objects.create(author=self.user, content="Hello")
+
+    def test_shards_of_a_post_are_folded_together(self):
+        # Net zero, but a batch holding only the -1 shard would fail the unsigned column
+        PostCounterShard.objects.create(post=self.post, shard=0, likes=-1)
+        PostCounterShard.objects.create(post=self.post, shard=1, likes=1)
+        other = Post.objects.create(author=self.user, content="Other")
+        add_to_counters(other.id, likes=2)
+
+        self.assertEqual(fold_counter_shards(batch_size=1), 2)
+
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.like_count, other.like_count), (0, 2))
+        self.assertFalse(PostCounterShard.objects.exists())
+
+    def test_fold_adds_pending_deltas(self):
+        add_to_counters(self.post.id, likes=3)
+        add_to_counters(self.post.id, likes=-1, comments=1)
+
+        fold_counter_shards()
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (2, 1))
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def test_names_are_sharded_once(self):
+        digest = hashlib.sha256(b"data").hexdigest()
+        expected = f"post_media/{digest[:2]}/{digest[2:4]}/{digest}.webp"
+
+        # Plain upload name, and a name derived from an already sharded blob
+        first = self.storage.save("post_media/photo.webp", ContentFile(b"data"))
+        derived = self.storage.save(f"post_media/ab/cd/{'ab' * 32}_320w.webp", ContentFile(b"data"))
+
+        self.assertEqual(first, expected)
+        self.assertEqual(derived, expected)
+
+    def test_duplicate_content_is_not_written(self):
+        name = self.storage.save("post_media/photo.jpg", ContentFile(b"data"))
+
+        with mock.patch('posts.storage.tempfile.mkstemp') as mkstemp:
+            self.assertEqual(self.storage.save("post_media/again.jpg", ContentFile(b"data")), name)
+
+        mkstemp.assert_not_called()
+
+    def test_reused_file_survives_garbage_collection(self):
+        name = self.storage.save("post_media/photo.jpg", ContentFile(b"data"))
+
+        # Unreferenced for longer than the grace period
+        MediaBlob.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(days=1))
+
+        # Same content saved again; its reference is only acquired at commit
+        self.assertEqual(self.storage.save("post_media/again.jpg", ContentFile(b"data")), name)
+
+        self.assertEqual(collect_garbage(grace=timedelta(hours=1), storage=self.storage), 0)
+        self.assertTrue(self.storage.exists(name))
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        self.enterContext(override_settings(CHUNKED_UPLOAD_DIR=upload_dir))
+
+        self.user = User.objects.create(email="author@example.com", username="author")
+        self.upload = MediaUpload.objects.create(
+            owner=self.user, filename="a.jpg", content_type="image/jpeg", total_size=8
+        )
+
+    def test_same_offset_twice_keeps_first_chunk(self):
+        # Second request still saw received_bytes=0
+        stale = MediaUpload.objects.get(pk=self.upload.pk)
+
+        write_chunk(self.upload, 0, 4, io.BytesIO(b"aaaa"))
+
+        with self.assertRaises(UploadError) as raised:
+            write_chunk(stale, 0, 4, io.BytesIO(b"bbbb"))
+
+        self.assertEqual(raised.exception.status_code, 409)
+        with open(self.upload.temp_path, 'rb') as temp_file:
+            self.assertEqual(temp_file.read(), b"aaaa")
+
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.received_bytes, 4)
+
+    def test_missing_temp_file_asks_for_restart(self):
+        write_chunk(self.upload, 0, 4, io.BytesIO(b"aaaa"))
+        os.remove(self.upload.temp_path)
+
+        with self.assertRaises(UploadError) as raised:
+            write_chunk(self.upload, 4, 4, io.BytesIO(b"bbbb"))
+
+        self.assertEqual(raised.exception.status_code, 409)
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.received_bytes, 4)
+
+    def test_post_closes_upload_files(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        write_chunk(self.upload, 0, 8, io.BytesIO(b"aaaabbbb"))
+        finalize_upload(self.upload)
+
+        opened = []
+
+        def open_upload(post, upload):
+            item = media_from_upload(post, upload)
+            opened.append(item.file.file)
+            return item
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('posts.views.media_from_upload', open_upload):
+            response = client.post('/api/posts/create/', {'upload_ids': [str(self.upload.id)]})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].closed)
+
+        # Moved into storage under its known hash, not copied
+        digest = hashlib.sha256(b"aaaabbbb").hexdigest()
+        stored = os.path.join(media_root, "post_media", digest[:2], digest[2:4], f"{digest}.jpg")
+        with open(stored, 'rb') as stored_file:
+            self.assertEqual(stored_file.read(), b"aaaabbbb")
+        self.assertFalse(os.path.exists(self.upload.temp_path))
+
+    def test_upload_is_attached_once(self):
+        write_chunk(self.upload, 0, 8, io.BytesIO(b"aaaabbbb"))
+        finalize_upload(self.upload)
+
+        # Both posts read the upload as complete before either claimed it
+        stale = MediaUpload.objects.get(pk=self.upload.pk)
+
+        claim_uploads(self.user, [self.upload])
+
+        with self.assertRaises(UploadError) as raised:
+            claim_uploads(self.user, [stale])
+
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(MediaUpload.objects.get(pk=self.upload.pk).status, 'attached')
+
+
+def make_cursor(direction, position):
+    payload = json.dumps({'d': direction, 'p': position}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+class BulkLikeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="liker@example.com", username="liker")
+        self.posts = [Post.objects.create(author=self.user, content=str(i), visibility='PUBLIC') for i in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk(self, like_status, posts):
+        operations = [{"post_id": post.id, "like_status": like_status} for post in posts]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/posts/like/bulk/', {"operations": operations}, format='json')
+
+        counter_writes = [q for q in queries if 'posts_postcountershard' in q['sql']]
+        self.assertEqual(len(counter_writes), 1)
+        return [result["status"] for result in response.json()["results"]]
+
+    def totals(self):
+        return [Post.objects.get(pk=post.pk).total_likes for post in self.posts]
+
+    def test_counters_follow_written_rows(self):
+        self.assertEqual(self.bulk("like", self.posts), ["liked"] * 4)
+        self.assertEqual(self.totals(), [1, 1, 1, 1])
+
+        self.assertEqual(self.bulk("dislike", self.posts[:3]), ["unliked"] * 3)
+        self.assertEqual(self.totals(), [0, 0, 0, 1])
+
+    def test_concurrent_unlike_keeps_other_deltas(self):
+        self.bulk("like", self.posts)
+
+        def unlike_first(*args, **kwargs):
+            # Another request unlikes the first post after this one read the likes
+            PostLike.objects.filter(user=self.user, post=self.posts[0]).delete()
+            add_to_counters(self.posts[0].id, likes=-1)
+
+        with mock.patch.object(PostLike.objects, 'bulk_create', side_effect=unlike_first):
+            operations = [{"post_id": post.id, "like_status": "dislike"} for post in self.posts[:3]]
+            response = self.client.post('/api/posts/like/bulk/', {"operations": operations}, format='json')
+
+        statuses = [result["status"] for result in response.json()["results"]]
+        self.assertEqual(statuses, ["not_liked", "unliked", "unliked"])
+        self.assertEqual(self.totals(), [0, 0, 0, 1])
+
+
+class CursorPaginationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="author@example.com", username="author")
+        self.post = Post.objects.create(author=self.user, content="Hello", visibility='PUBLIC')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_comment_pages_round_trip(self):
+        for i in range(5):
+            Comment.objects.create(post=self.post, author=self.user, content=str(i))
+
+        url = f'/api/posts/comment/{self.post.id}/'
+        page = self.client.get(url, {'page_size': 2}).json()
+        contents = [comment['content'] for comment in page['results']]
+
+        while page['next']:
+            page = self.client.get(url, {'page_size': 2, 'cursor': page['next']}).json()
+            contents += [comment['content'] for comment in page['results']]
+
+        self.assertEqual(contents, ['0', '1', '2', '3', '4'])
+
+        # And back from the last page
+        page = self.client.get(url, {'page_size': 2, 'cursor': page['prev']}).json()
+        self.assertEqual([comment['content'] for comment in page['results']], ['2', '3'])
+
+    def test_bad_cursors_are_rejected(self):
+        bad_cursors = {
+            '/api/posts/feed/': [
+                make_cursor('next', ['garbage', 1]),
+                make_cursor('next', ['2024-01-01T00:00:00+00:00', 'x']),
+                make_cursor('next', [None, 1]),
+                make_cursor('next', [[1], 1]),
+            ],
+            f'/api/posts/comment/{self.post.id}/': [
+                make_cursor('next', ['garbage']),
+                make_cursor('prev', [{'a': 1}]),
+            ],
+            '/api/posts/trending/': [
+                make_cursor('next', ['high', 1]),
+            ],
+            '/api/posts/search/': [
+                make_cursor('next', ['rank', 1]),
+            ],
+            '/api/posts/feed/?x=1': [
+                'not-base64!',
+                make_cursor('sideways', ['2024-01-01T00:00:00+00:00', 1]),
+            ],
+        }
+
+        for url, cursors in bad_cursors.items():
+            for cursor in cursors:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(url, {'cursor': cursor, 'q': 'hello'})
+                    self.assertEqual(response.status_code, 400)
+
+    def test_valid_datetime_cursor(self):
+        response = self.client.get('/api/posts/feed/', {'cursor': make_cursor('next', ['2030-01-01T00:00:00+00:00', 1])})
+        self.assertEqual(response.status_code, 200)
+
+
+class FeedETagTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="reader@example.com", username="reader")
+        self.commenter = User.objects.create(email="commenter@example.com", username="commenter")
+        self.post = Post.objects.create(author=self.user, content="Hello", visibility='PUBLIC')
+        Comment.objects.create(post=self.post, author=self.commenter, content="Hi")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def poll(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/posts/feed/', **headers)
+
+    def test_renames_change_the_tag(self):
+        for user, field in [(self.user, 'username'), (self.commenter, 'username'), (self.user, 'email')]:
+            with self.subTest(user=user.pk, field=field):
+                etag = self.poll()['ETag']
+                self.assertEqual(self.poll(etag).status_code, 304)
+
+                setattr(user, field, f"renamed{user.pk}{field}@example.com")
+                user.save(update_fields=[field])
+
+                response = self.poll(etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_user_saves_keep_the_tag(self):
+        etag = self.poll()['ETag']
+
+        # e.g. a password change or email verification: full save, same name/email
+        self.commenter.set_password("new password")
+        self.commenter.save()
+        self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(self.poll(etag).status_code, 304)
+
+
+class VisibilityTests(TestCase):
+
+    # Who sees what, for the SQL filter and the batch check alike
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(email="author@example.com", username="author")
+        self.friend = User.objects.create(email="friend@example.com", username="friend")
+        self.stranger = User.objects.create(email="stranger@example.com", username="stranger")
+        self.requester = User.objects.create(email="requester@example.com", username="requester")
+
+        Friendship.objects.create(user1=self.author, user2=self.friend)
+        FriendRequest.objects.create(sender=self.requester, receiver=self.author, status='pending')
+
+        self.posts = {
+            visibility: Post.objects.create(author=self.author, content=visibility, visibility=visibility)
+            for visibility in ('PUBLIC', 'FRIENDS', 'PRIVATE')
+        }
+        for post in self.posts.values():
+            Comment.objects.create(post=post, author=self.author, content="comment")
+
+    def visible(self, user):
+        # Both paths must agree
+        in_sql = set(filter_visible(Post.objects.all(), user).values_list('content', flat=True))
+        in_sql_related = set(
+            filter_visible(Comment.objects.all(), user, prefix='post__').values_list('post__content', flat=True)
+        )
+        access = can_view(user, self.posts.values())
+        in_batch = {post.content for post in self.posts.values() if access[post.id]}
+
+        self.assertEqual(in_sql, in_batch)
+        self.assertEqual(in_sql_related, in_batch)
+        return in_sql
+
+    def test_rules(self):
+        expected = {
+            self.author: {'PUBLIC', 'FRIENDS', 'PRIVATE'},
+            self.friend: {'PUBLIC', 'FRIENDS'},
+            self.stranger: {'PUBLIC'},
+            self.requester: {'PUBLIC'},
+        }
+
+        for user, visibilities in expected.items():
+            with self.subTest(user=user.username):
+                self.assertEqual(self.visible(user), visibilities)
+
+    def test_unfriending_revokes_friends_posts(self):
+        friends_post = self.posts['FRIENDS']
+        self.assertTrue(can_interact(self.friend, friends_post))
+
+        Friendship.objects.filter(user1=self.author, user2=self.friend).delete()
+
+        self.assertFalse(can_interact(self.friend, friends_post))
+        self.assertEqual(self.visible(self.friend), {'PUBLIC'})
+
+
+class TimelineTests(TestCase):
+
+    # Fan-out on post creation, backfill on accept, prune on unfriend and the
+    # merge of posts pulled at read time, through the API
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(email="author@example.com", username="author")
+        self.friend = User.objects.create(email="friend@example.com", username="friend")
+        self.stranger = User.objects.create(email="stranger@example.com", username="stranger")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def befriend(self, sender, receiver):
+        self.client_for(sender).post(f'/api/friends/send/{receiver.username}/')
+        friend_request = FriendRequest.objects.get(sender=sender, receiver=receiver, status='pending')
+        response = self.client_for(receiver).patch(
+            f'/api/friends/request/{friend_request.id}/', {'action': 'accept'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def create_posts(self, user):
+        # {visibility: post id}, oldest first
+        posts = {}
+        for visibility in ('PUBLIC', 'FRIENDS', 'PRIVATE'):
+            response = self.client_for(user).post('/api/posts/create/', {'content': visibility, 'visibility': visibility})
+            self.assertEqual(response.status_code, 201)
+            posts[visibility] = response.json()['id']
+        return posts
+
+    def timeline(self, user):
+        return set(TimelineEntry.objects.filter(owner=user).values_list('post_id', flat=True))
+
+    def feed(self, user):
+        ids = []
+        client = self.client_for(user)
+        page = client.get('/api/posts/feed/', {'page_size': 2}).json()
+        ids += [post['id'] for post in page['results']]
+
+        while page['next']:
+            page = client.get('/api/posts/feed/', {'page_size': 2, 'cursor': page['next']}).json()
+            ids += [post['id'] for post in page['results']]
+
+        return ids
+
+    def test_new_posts_fan_out(self):
+        self.befriend(self.author, self.friend)
+        posts = self.create_posts(self.author)
+
+        self.assertEqual(self.timeline(self.author), set(posts.values()))
+        self.assertEqual(self.timeline(self.friend), {posts['PUBLIC'], posts['FRIENDS']})
+        self.assertEqual(self.timeline(self.stranger), set())
+        self.assertEqual(self.feed(self.friend), [posts['FRIENDS'], posts['PUBLIC']])
+
+    def test_accept_backfills_and_unfriend_prunes(self):
+        posts = self.create_posts(self.author)
+        self.assertEqual(self.timeline(self.friend), set())
+
+        self.befriend(self.author, self.friend)
+        self.assertEqual(self.timeline(self.friend), {posts['PUBLIC'], posts['FRIENDS']})
+
+        self.client_for(self.friend).delete(f'/api/friends/unfriend/{self.author.username}/')
+        self.assertEqual(self.timeline(self.friend), set())
+        self.assertEqual(self.timeline(self.author), set(posts.values()))
+
+    def test_high_fan_out_posts_are_pulled(self):
+        self.befriend(self.author, self.friend)
+        own = self.client_for(self.friend).post('/api/posts/create/', {'content': 'own'}).json()['id']
+
+        with self.settings(TIMELINE_FANOUT_LIMIT=0):
+            posts = self.create_posts(self.author)
+
+        fanned_out = dict(Post.objects.filter(id__in=posts.values()).values_list('visibility', 'is_fanned_out'))
+        self.assertEqual(fanned_out, {'PUBLIC': False, 'FRIENDS': False, 'PRIVATE': True})
+
+        # Not pushed, but merged into the friend's feed in order; the private post never shows
+        self.assertEqual(self.timeline(self.friend), {own})
+        self.assertEqual(self.feed(self.friend), [posts['FRIENDS'], posts['PUBLIC'], own])
+        self.assertEqual(self.feed(self.stranger), [])
+
+        self.client_for(self.friend).delete(f'/api/friends/unfriend/{self.author.username}/')
+        self.assertEqual(self.feed(self.friend), [own])
+
+
+class PostQueryPlanTests(QueryPlanTestMixin, TestCase):
+
+    # Hot feed / post lookups must be served by an index, never a full table scan
+
+    def setUp(self):
+        self.user = User.objects.create(email="author@example.com", username="author")
+        self.post = Post.objects.create(author=self.user, content="Hello")
+
+    def test_timeline_page(self):
+        self.assertNoFullScan(
+            TimelineEntry.objects.filter(owner=self.user)
+            .select_related('post__author').order_by('-post_created_at', '-post_id')[:21]
+        )
+
+    def test_pulled_feed_posts(self):
+        # Fan-out-on-read part of the feed
+        self.assertNoFullScan(
+            filter_visible(
+                Post.objects.filter(author__in=friend_ids_query(self.user.id), is_fanned_out=False),
+                self.user
+            ).order_by('-created_at', '-id')[:21]
+        )
+
+    def test_author_posts(self):
+        self.assertNoFullScan(Post.objects.filter(author=self.user).order_by('-created_at', '-id')[:21])
+
+    def test_comment_page(self):
+        self.assertNoFullScan(
+            Comment.objects.visible().filter(post=self.post).order_by('comment_number')[:50]
+        )
+
+    def test_like_lookup(self):
+        self.assertNoFullScan(PostLike.objects.filter(post=self.post, user=self.user))
+
+    def test_trending_page(self):
+        self.assertNoFullScan(TrendingPost.objects.select_related('post').order_by('-score', '-post_id')[:20])
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from friends.cache import get_friend_ids, load_friend_ids
+from friends.graph import friend_ids_query
+from posts.models import Post, TimelineEntry
+from posts.visibility import filter_visible
+
+
+# Materialized per-user timelines (fan-out-on-write).
+# A new post is pushed into the author's and every friend's timeline, so the feed
+# is a single index range on TimelineEntry(owner, post_created_at).
+# Authors with more than TIMELINE_FANOUT_LIMIT friends are not pushed; their posts
+# are pulled at read time instead (fan-out-on-read).
+
+
+def _add_entries(owner_ids, posts):
+    # Batched insert of (owner, post) rows, existing rows are skipped
+
+    entries = (
+        TimelineEntry(owner_id=owner_id, post_id=post.id, post_created_at=post.created_at)
+        for owner_id in owner_ids
+        for post in posts
+    )
+
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    # Push a newly created post into the author's and friends' timelines
+
+    owner_ids = [post.author_id]
+
+    # Private posts are only visible to the author
+    if post.visibility != 'PRIVATE':
+        friend_ids = load_friend_ids(post.author_id)
+
+        if len(friend_ids) > settings.TIMELINE_FANOUT_LIMIT:
+            # Too many friends: readers pull this post at read time
+            Post.objects.filter(pk=post.pk).update(is_fanned_out=False)
+            post.is_fanned_out = False
+        else:
+            owner_ids.extend(friend_ids)
+
+    _add_entries(owner_ids, [post])
+
+
+def backfill_timeline(owner_id, author_id):
+    # Copy the author's most recent shareable posts into owner's timeline
+
+    posts = Post.objects.filter(
+        author_id=author_id,
+        is_fanned_out=True
+    ).exclude(
+        visibility='PRIVATE'
+    ).order_by('-created_at', '-id').only('id', 'created_at')[:settings.TIMELINE_BACKFILL_LIMIT]
+
+    _add_entries([owner_id], list(posts))
+
+
+def link_timelines(user_a, user_b):
+    # Called when a friendship is accepted
+    backfill_timeline(user_a.id, user_b.id)
+    backfill_timeline(user_b.id, user_a.id)
+
+
+def unlink_timelines(user_a, user_b):
+    # Called when a friendship is removed: drop each other's posts from the timelines
+    TimelineEntry.objects.filter(
+        Q(owner=user_a, post__author=user_b) | Q(owner=user_b, post__author=user_a)
+    ).delete()
+
+
+def rebuild_timeline(user):
+    # Rebuild one timeline from scratch (own posts + friends' posts)
+
+    with transaction.atomic():
+        TimelineEntry.objects.filter(owner=user).delete()
+
+        own_posts = Post.objects.filter(author=user).only('id', 'created_at')
+        _add_entries([user.id], list(own_posts))
+
+        for friend_id in get_friend_ids(user):
+            backfill_timeline(user.id, friend_id)
+
+
+def get_timeline_page(user, paginator):
+    # One page of the user's feed, newest first.
+    # Timeline entries are visibility-checked when they are written.
+
+    entries = TimelineEntry.objects.filter(
+        owner=user
+    ).select_related('post__author')
+
+    # Fan-out-on-read: friends' posts that were not pushed at write time
+    pulled = filter_visible(
+        Post.objects.filter(author__in=friend_ids_query(user.id), is_fanned_out=False),
+        user
+    ).annotate(
+        post_created_at=F('created_at'),
+        post_id=F('id')
+    ).select_related('author')
+
+    rows = paginator.paginate(entries, pulled)
+
+    return [row.post if isinstance(row, TimelineEntry) else row for row in rows]
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from posts.models import Comment, PostLike, TrendingPost
+
+
+# Trending PUBLIC posts.
+# A periodic job counts the likes and comments of the last TRENDING_WINDOW_HOURS
+# per post and hour, weighs every hour bucket by its age with an exponential
+# decay (half-life TRENDING_HALF_LIFE_HOURS) and stores the best
+# TRENDING_SIZE posts in TrendingPost, which the endpoint reads in score order.
+
+
+def _hourly_counts(queryset, since):
+    # {(post_id, hour): count} of the rows created since `since`
+    return queryset.filter(
+        created_at__gte=since,
+        post__visibility='PUBLIC'
+    ).annotate(
+        hour=TruncHour('created_at')
+    ).values_list('post_id', 'hour').annotate(count=Count('id')).order_by()
+
+
+def compute_scores(now=None):
+    # {post_id: score} over the trending window
+
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    half_life = settings.TRENDING_HALF_LIFE_HOURS
+
+    weighted = (
+        (_hourly_counts(PostLike.objects.all(), since), settings.TRENDING_LIKE_WEIGHT),
+        (_hourly_counts(Comment.objects.visible(), since), settings.TRENDING_COMMENT_WEIGHT),
+    )
+
+    scores = defaultdict(float)
+    for rows, weight in weighted:
+        for post_id, hour, count in rows:
+            # Age of the middle of the bucket, in hours
+            age = max(0.0, (now - hour).total_seconds() / 3600 - 0.5)
+            scores[post_id] += weight * count * 0.5 ** (age / half_life)
+
+    return scores
+
+
+def refresh_trending(now=None):
+    # Replace the ranked table with the current top posts, returns their number
+
+    now = now or timezone.now()
+    scores = compute_scores(now)
+
+    top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:settings.TRENDING_SIZE]
+
+    with transaction.atomic():
+        TrendingPost.objects.exclude(post_id__in=[post_id for post_id, _ in top]).delete()
+
+        TrendingPost.objects.bulk_create(
+            [TrendingPost(post_id=post_id, score=score, refreshed_at=now) for post_id, score in top],
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['post'],
+            update_fields=['score', 'refreshed_at']
+        )
+
+    return len(top)
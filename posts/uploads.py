@@ -0,0 +1,196 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import MediaUpload, PostMedia
+
+
+# Streaming, resumable chunked uploads.
+# Each PUT is copied from the request stream in small blocks, so a chunk is
+# never held in memory as a whole. Chunks must arrive in
+# order (offset == received_bytes); after a dropped connection the client asks
+# for received_bytes and continues from there.
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    # Rejected chunk/finalize, carries the HTTP status to answer with
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def media_type_for(content_type):
+    # 'IMAGE' / 'VIDEO' from a MIME type, None if not allowed
+    if content_type.startswith('image'):
+        return 'IMAGE'
+    if content_type.startswith('video'):
+        return 'VIDEO'
+    return None
+
+
+def write_chunk(upload, offset, length, stream, chunk_sha256=None):
+    # Append `length` bytes from `stream` at `offset` of the upload's temp file.
+    # The chunk is first streamed into its own file and checked; it is copied into
+    # the upload only after this request has claimed the offset, so two PUTs of
+    # the same offset can never both write to the upload.
+
+    if upload.status != 'pending':
+        raise UploadError("Upload is already finalized.", 409)
+
+    if offset != upload.received_bytes:
+        raise UploadError("Chunk offset does not match received bytes.", 409)
+
+    if offset + length > upload.total_size:
+        raise UploadError("Chunk goes past the declared file size.", 400)
+
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+
+    fd, chunk_path = tempfile.mkstemp(dir=settings.CHUNKED_UPLOAD_DIR, prefix=f"{upload.id}.", suffix='.chunk')
+
+    try:
+        digest = hashlib.sha256()
+        written = 0
+
+        with os.fdopen(fd, 'wb') as chunk_file:
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                chunk_file.write(block)
+                digest.update(block)
+                written += len(block)
+
+        if written != length or (chunk_sha256 and digest.hexdigest() != chunk_sha256.lower()):
+            # Incomplete or corrupted chunk: nothing was written, the client can resend
+            raise UploadError("Chunk is incomplete or its checksum does not match.", 400)
+
+        with transaction.atomic():
+            # Claim the offset; the row stays locked until the chunk is in the file
+            claimed = MediaUpload.objects.filter(
+                pk=upload.pk,
+                status='pending',
+                received_bytes=offset
+            ).update(received_bytes=offset + length, updated_at=timezone.now())
+
+            if not claimed:
+                raise UploadError("Upload was modified concurrently.", 409)
+
+            _append_chunk(upload, offset, chunk_path)
+    finally:
+        os.remove(chunk_path)
+
+    upload.received_bytes = offset + length
+    return upload
+
+
+def _append_chunk(upload, offset, chunk_path):
+    try:
+        temp_file = open(upload.temp_path, 'r+b' if offset else 'wb')
+    except FileNotFoundError:
+        raise UploadError("Upload data is missing, start a new upload.", 409)
+
+    with temp_file, open(chunk_path, 'rb') as chunk_file:
+        temp_file.seek(offset)
+        shutil.copyfileobj(chunk_file, temp_file, BLOCK_SIZE)
+        # Drop anything left past this chunk by an earlier failed attempt
+        temp_file.truncate()
+
+
+def finalize_upload(upload):
+    # Check size and whole-file SHA-256, then mark the upload complete
+
+    if upload.status != 'pending':
+        raise UploadError("Upload is already finalized.", 409)
+
+    if upload.received_bytes != upload.total_size:
+        raise UploadError("Upload is incomplete.", 400)
+
+    digest = hashlib.sha256()
+    try:
+        with open(upload.temp_path, 'rb') as temp_file:
+            for block in iter(lambda: temp_file.read(BLOCK_SIZE), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        raise UploadError("Upload data is missing, start a new upload.", 409)
+
+    checksum = digest.hexdigest()
+
+    if upload.sha256 and upload.sha256.lower() != checksum:
+        raise UploadError("File checksum does not match.", 400)
+
+    upload.sha256 = checksum
+    upload.status = 'complete'
+    upload.save(update_fields=['sha256', 'status', 'updated_at'])
+    return upload
+
+
+class ChunkedUploadFile(File):
+    # A finalized upload's temp file: its SHA-256 is already known, and the storage
+    # may move the file into place instead of copying it (the post owns the upload)
+
+    def __init__(self, upload):
+        super().__init__(open(upload.temp_path, 'rb'), name=upload.filename)
+        self.sha256 = upload.sha256
+        self.upload = upload
+
+    def temporary_file_path(self):
+        return self.upload.temp_path
+
+
+def media_from_upload(post, upload):
+    # Unsaved PostMedia reading the upload's temp file.
+    # The file is moved into media storage when the row is inserted; the caller closes it.
+
+    try:
+        file = ChunkedUploadFile(upload)
+    except FileNotFoundError:
+        # Moved by an earlier post attempt that was rolled back
+        raise UploadError("Upload data is missing, start a new upload.", 409)
+
+    return PostMedia(
+        post=post,
+        media_type=media_type_for(upload.content_type),
+        file=file
+    )
+
+
+def claim_uploads(owner, uploads):
+    # Mark finalized uploads attached, inside the post's transaction. Like chunk
+    # offsets, the status is claimed with a conditional update: an upload another
+    # post already took fails the whole post. Temp files are only removed once the
+    # post is committed.
+
+    claimed = MediaUpload.objects.filter(
+        id__in=[upload.id for upload in uploads],
+        owner=owner,
+        status='complete'
+    ).update(status='attached', updated_at=timezone.now())
+
+    if claimed != len(uploads):
+        raise UploadError("Uploads not found or not finalized.", 400)
+
+    temp_paths = [upload.temp_path for upload in uploads]
+
+    def remove_temp_files():
+        for path in temp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    transaction.on_commit(remove_temp_files)
+
+
+def delete_upload(upload):
+    # Drop a session and its temp file
+
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+    upload.delete()
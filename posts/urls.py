@@ -1,12 +1,20 @@
 from django.urls import path
 from posts.views import CreatePostView, FeedView, PostLikeView, CreateCommentView, CommentModifyView, \
-    DeleteAllPostCommentsView
+    DeleteAllPostCommentsView, BulkPostLikeView, CommentPurgeJobView, MediaUploadView, MediaUploadChunkView, \
+    MediaUploadFinalizeView, TrendingView, PostSearchView
 
 urlpatterns = [
     path('create/', CreatePostView.as_view(), name='create-post'),
+    path('uploads/', MediaUploadView.as_view(), name='media-upload'),
+    path('uploads/<uuid:upload_id>/', MediaUploadChunkView.as_view(), name='media-upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', MediaUploadFinalizeView.as_view(), name='media-upload-finalize'),
     path('feed/', FeedView.as_view(), name='feed'),
+    path('trending/', TrendingView.as_view(), name='trending'),
+    path('search/', PostSearchView.as_view(), name='post-search'),
     path('like/<int:post_id>/', PostLikeView.as_view(), name='post-like'),
+    path('like/bulk/', BulkPostLikeView.as_view(), name='post-like-bulk'),
     path('comment/<int:post_id>/', CreateCommentView.as_view(), name='post-comment  '),
     path('comment/modify/<str:custom_id>/', CommentModifyView.as_view(), name = 'comment-modify'),
     path('comment/delete-all/<int:post_id>/', DeleteAllPostCommentsView.as_view(), name='delete_all_post_comments'),
+    path('comment/delete-all/jobs/<uuid:job_id>/', CommentPurgeJobView.as_view(), name='comment-purge-job'),
 ]
\ No newline at end of file
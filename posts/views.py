@@ -1,13 +1,32 @@
+import os
+
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
-
-from posts.models import Post, PostMedia, PostLike, Comment
-from posts.serializers import PostSerializer, CommentSerializer
-from friends.models import Friendship
+from django.utils import timezone
+
+from friends.cache import get_friendship_version
+from posts.blobs import acquire_blobs, discard_files
+from posts.models import Post, PostMedia, PostLike, Comment, CommentPurgeJob, MediaUpload, TrendingPost
+from posts.counters import add_many_to_counters, add_to_counters
+from posts.derivatives import generate_derivatives
+from posts.pagination import KeysetPaginator
+from posts.purge import start_comment_purge
+from posts.previews import attach_comment_previews
+from posts.timeline import fan_out_post, get_timeline_page
+from posts.uploads import UploadError, claim_uploads, delete_upload, finalize_upload, media_from_upload, \
+    media_type_for, write_chunk
+from posts.search import search_available, search_posts
+from posts.visibility import can_interact, can_view, filter_visible
+from posts.serializers import PostSerializer, CommentSerializer, CommentPurgeJobSerializer
+from Social_Media_app.etags import compute_etag, etag_matches, get_version, not_modified, set_etag
+from Social_Media_app.tasks import run_in_background
 
 
 # Create your views here.
@@ -26,92 +45,377 @@ class CreatePostView(APIView):
         # Get uploaded files (can be multiple)
         files = request.FILES.getlist('media')
 
+        # Finalized chunked uploads to attach (see MediaUploadView)
+        if hasattr(request.data, 'getlist'):
+            upload_ids = request.data.getlist('upload_ids')
+        else:
+            upload_ids = request.data.get('upload_ids') or []
+
         # Validate: must have text or media
-        if not content and not files:
+        if not content and not files and not upload_ids:
             return Response(
                 {"error": "Post must contain text or at least one media file."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create Post instance
-        post = Post.objects.create(
-            author=request.user,
-            content=content,
-            visibility=visibility
-        )
-
-        # Create media objects if provided
+        # Validate every file before anything is written
+        file_types = []
         for file in files:
             # Determine media type automatically
-            if file.content_type.startswith('image'):
-                media_type = 'IMAGE'
-            elif file.content_type.startswith('video'):
-                media_type = 'VIDEO'
-            else:
-                post.delete()  # rollback if invalid file
+            media_type = media_type_for(file.content_type)
+
+            if media_type is None:
                 return Response(
                     {"error": "Only image and video files are allowed."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            PostMedia.objects.create(
-                post=post,
-                media_type=media_type,
-                file=file
-            )
+            file_types.append((file, media_type))
+
+        uploads = []
+        if upload_ids:
+            try:
+                uploads = list(MediaUpload.objects.filter(
+                    id__in=upload_ids,
+                    owner=request.user,
+                    status='complete'
+                ))
+            except ValidationError:
+                uploads = []
+
+            if len(uploads) != len(set(map(str, upload_ids))):
+                return Response(
+                    {"error": "Uploads not found or not finalized."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        media = []
+        upload_files = []
+        try:
+            # Post, media rows and timeline entries are committed together
+            with transaction.atomic():
+                # Before any temp file is opened: a concurrent post may have taken them
+                if uploads:
+                    claim_uploads(request.user, uploads)
+
+                post = Post.objects.create(
+                    author=request.user,
+                    content=content,
+                    visibility=visibility
+                )
+
+                media = [
+                    PostMedia(post=post, media_type=media_type, file=file)
+                    for file, media_type in file_types
+                ]
+                for upload in uploads:
+                    item = media_from_upload(post, upload)
+                    # The temp file handle itself: once saved, item.file would reopen the stored copy
+                    upload_files.append(item.file.file)
+                    media.append(item)
+
+                # Files are written to storage as the rows are inserted
+                PostMedia.objects.bulk_create(media)
+
+                # bulk_create skips post_save: count blob references and queue derivatives here
+                acquire_blobs([item.file.name for item in media])
+
+                for item in media:
+                    if item.media_type == 'IMAGE':
+                        run_in_background(generate_derivatives, item.id)
+
+                # Push the post into the author's and friends' timelines
+                fan_out_post(post)
+        except UploadError as exc:
+            return Response({"error": str(exc)}, status=exc.status_code)
+        except Exception:
+            # Rolled back: hand the files already written over to blob garbage collection
+            discard_files([item.file.name for item in media if item.file._committed and item.file.name])
+            raise
+        finally:
+            for upload_file in upload_files:
+                upload_file.close()
 
         # Serialize and return created post
         serializer = PostSerializer(post, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class MediaUploadView(APIView):
+    # POST -> Start a chunked (resumable) upload
+    # Body: filename, content_type, size (bytes), sha256 (optional, hex of the whole file)
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        filename = request.data.get('filename')
+        content_type = request.data.get('content_type', '')
+        sha256 = (request.data.get('sha256') or '').lower()
+
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+
+        if not filename or size <= 0:
+            return Response(
+                {"error": "filename and a positive size are required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if media_type_for(content_type) is None:
+            return Response(
+                {"error": "Only image and video files are allowed."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if size > settings.UPLOAD_MAX_FILE_SIZE:
+            return Response(
+                {"error": f"File is larger than {settings.UPLOAD_MAX_FILE_SIZE} bytes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if sha256 and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256)):
+            return Response(
+                {"error": "sha256 must be a hex SHA-256 digest."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        upload = MediaUpload.objects.create(
+            owner=request.user,
+            filename=os.path.basename(filename)[:255],
+            content_type=content_type,
+            total_size=size,
+            sha256=sha256
+        )
+
+        return Response(
+            {
+                "id": str(upload.id),
+                "received_bytes": 0,
+                "total_size": upload.total_size,
+                "max_chunk_size": settings.UPLOAD_MAX_CHUNK_SIZE,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+class MediaUploadChunkView(APIView):
+    # GET    -> Upload status (received_bytes tells the client where to resume)
+    # PUT    -> Append a chunk: raw bytes in the body, ?offset=<received_bytes>
+    #           Optional header X-Chunk-SHA256 to verify the chunk
+    # DELETE -> Abort the upload
+
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, request, upload_id):
+        return get_object_or_404(MediaUpload, id=upload_id, owner=request.user)
+
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+
+        return Response({
+            "id": str(upload.id),
+            "status": upload.status,
+            "received_bytes": upload.received_bytes,
+            "total_size": upload.total_size,
+        })
+
+    def put(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+
+        try:
+            offset = int(request.query_params.get('offset'))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "offset query parameter is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if length <= 0:
+            return Response(
+                {"error": "Chunk body is empty or Content-Length is missing."},
+                status=status.HTTP_411_LENGTH_REQUIRED
+            )
+
+        if length > settings.UPLOAD_MAX_CHUNK_SIZE:
+            return Response(
+                {"error": f"Chunk is larger than {settings.UPLOAD_MAX_CHUNK_SIZE} bytes."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        try:
+            # request.stream is read block by block, the body is never buffered whole
+            write_chunk(
+                upload,
+                offset,
+                length,
+                request.stream,
+                chunk_sha256=request.headers.get('X-Chunk-SHA256')
+            )
+        except UploadError as exc:
+            return Response(
+                {"error": str(exc), "received_bytes": upload.received_bytes},
+                status=exc.status_code
+            )
+
+        return Response({
+            "id": str(upload.id),
+            "received_bytes": upload.received_bytes,
+            "total_size": upload.total_size,
+        })
+
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+
+        if upload.status == 'attached':
+            return Response(
+                {"error": "Upload is already attached to a post."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        delete_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MediaUploadFinalizeView(APIView):
+    # POST -> Verify size + SHA-256 of a fully received upload.
+    # The returned id can then be passed to CreatePostView as upload_ids.
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        upload = get_object_or_404(MediaUpload, id=upload_id, owner=request.user)
+
+        try:
+            finalize_upload(upload)
+        except UploadError as exc:
+            return Response(
+                {"error": str(exc), "received_bytes": upload.received_bytes},
+                status=exc.status_code
+            )
+
+        return Response({
+            "id": str(upload.id),
+            "status": upload.status,
+            "sha256": upload.sha256,
+            "total_size": upload.total_size,
+        })
+
+
 class FeedView(APIView):
     # Returns: Logged-in user's posts, Friends' posts, Ordered by newest first
+    # Paginated with opaque cursors keyed on (created_at, id): ?cursor=<next|prev>&page_size=<n>
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
+        # Read one page of the materialized timeline (see posts.timeline)
+        paginator = KeysetPaginator(request, ordering=('-post_created_at', '-post_id'))
+        page = get_timeline_page(request.user, paginator)
+
+        # Pending counter deltas are part of both the ETag and the response
+        prefetch_related_objects(page, 'counter_shards')
+
+        # Unchanged since the client's last poll: skip media, previews and serialization
+        etag = self.get_etag(request, page, paginator)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # Prefetch media and comment previews for the page only
+        prefetch_related_objects(page, 'media')
+        attach_comment_previews(page, settings.FEED_COMMENT_PREVIEW_SIZE)
+
+        serializer = PostSerializer(page, many=True)
+        return set_etag(paginator.get_paginated_response(serializer.data), etag)
+
+    def get_etag(self, request, page, paginator):
+        # Post rows change on media/derivative updates and new/edited comments,
+        # counters change through the shards, the page set through the friend list.
+        # Authors are shown by name: post authors are already loaded, renames of
+        # comment authors bump the 'user-identity' version.
+        return compute_etag(
+            'feed',
+            request.user.id,
+            get_friendship_version(request.user.id),
+            get_version('user-identity'),
+            paginator.next_cursor,
+            paginator.prev_cursor,
+            [
+                (
+                    post.id,
+                    post.author.username,
+                    post.author.email,
+                    post.updated_at,
+                    post.total_likes,
+                    post.total_comments,
+                    post.last_comment_number,
+                    post.comments_hidden_upto,
+                )
+                for post in page
+            ]
+        )
+
+
+class TrendingView(APIView):
+    # PUBLIC posts ranked by time-decayed engagement (see posts.trending)
+    # Paginated with opaque cursors keyed on (score, post): ?cursor=<next|prev>&page_size=<n>
+
+    permission_classes = [IsAuthenticated]
 
-        # 1- Get accepted friendships
-        friendships = Friendship.objects.filter(
-            Q(user1=user) | Q(user2=user)
+    def get(self, request):
+        # One range scan on the ranked table
+        paginator = KeysetPaginator(request, ordering=('-score', '-post_id'))
+        rows = paginator.paginate(
+            TrendingPost.objects.filter(post__visibility='PUBLIC').select_related('post__author')
         )
+        page = [row.post for row in rows]
 
-        # 2- Extract friend IDs
-        friend_ids = []
+        prefetch_related_objects(page, 'media', 'counter_shards')
+        attach_comment_previews(page, settings.FEED_COMMENT_PREVIEW_SIZE)
 
-        for friendship in friendships:
-            if friendship.user1 == user:
-                friend_ids.append(friendship.user2.id)
-            else:
-                friend_ids.append(friendship.user1.id)
+        serializer = PostSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
-        # 3- Fetch posts (own + friends)
-        posts = Post.objects.filter(
-            Q(author=user) | Q(author__in=friend_ids)
-        ).select_related('author').prefetch_related('media').order_by('-created_at')
 
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+class PostSearchView(APIView):
+    # GET -> Posts whose content matches ?q=<words>, best match first (full-text index)
+    # Only posts the user may see; paginated with ?cursor=<next>&page_size=<n>
 
+    permission_classes = [IsAuthenticated]
 
-def can_interact(user, post):
-    # Who can interact with the post e.g. see, like and comment on post
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
 
-    if post.author == user:
-        return True
+        if not text:
+            return Response(
+                {"error": "q is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    if post.visibility == "PUBLIC":
-        return True
+        if search_available():
+            # Cursor is the (rank, id) of the last result
+            paginator = KeysetPaginator(request, ordering=('search_rank', 'id'), model=Post)
+            _, position = paginator.decode_cursor(request.query_params.get(paginator.cursor_query_param))
+
+            page = search_posts(request.user, text, after=position, limit=paginator.page_size)
+
+            if len(page) > paginator.page_size:
+                page = page[:paginator.page_size]
+                paginator.next_cursor = paginator.encode_cursor('next', page[-1])
+        else:
+            # No full-text index on this database: substring match, newest first
+            paginator = KeysetPaginator(request)
+            page = paginator.paginate(
+                filter_visible(Post.objects.filter(content__icontains=text), request.user).select_related('author')
+            )
 
-    if post.visibility == "FRIENDS":
-        return Friendship.objects.filter(
-            Q(user1=user, user2=post.author) |
-            Q(user1=post.author, user2=user)
-        ).exists()
+        prefetch_related_objects(page, 'media', 'counter_shards')
+        attach_comment_previews(page, settings.FEED_COMMENT_PREVIEW_SIZE)
 
-    return False
+        serializer = PostSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class PostLikeView(APIView):
@@ -133,23 +437,11 @@ class PostLikeView(APIView):
             )
 
         #  Visibility Check (CRITICAL)
-
-        # If post is not authored by current user
-        if post.author != user:
-
-            # If visibility is FRIENDS → must be friend
-            if post.visibility == "FRIENDS":
-
-                is_friend = Friendship.objects.filter(
-                    Q(user1=user, user2=post.author) |
-                    Q(user1=post.author, user2=user)
-                ).exists()
-
-                if not is_friend:
-                    return Response(
-                        {"error": "You cannot interact with this post."},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
+        if not can_interact(user, post):
+            return Response(
+                {"error": "You cannot interact with this post."},
+                status=status.HTTP_403_FORBIDDEN
+            )
 
         # Like / Unlike Logic
         existing_like = PostLike.objects.filter(
@@ -166,7 +458,10 @@ class PostLikeView(APIView):
                     status=status.HTTP_200_OK
                 )
 
-            PostLike.objects.create(post=post, user=user)
+            # Row and counter delta commit together, a recompute never sees only one of them
+            with transaction.atomic():
+                PostLike.objects.create(post=post, user=user)
+                add_to_counters(post.id, likes=1)
 
             return Response(
                 {"message": "Post liked successfully."},
@@ -182,7 +477,12 @@ class PostLikeView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            existing_like.delete()
+            with transaction.atomic():
+                deleted, _ = existing_like.delete()
+
+                # Already removed by a concurrent unlike
+                if deleted:
+                    add_to_counters(post.id, likes=-1)
 
             return Response(
                 {"message": "Post unliked successfully."},
@@ -190,11 +490,165 @@ class PostLikeView(APIView):
             )
 
 
+class BulkPostLikeView(APIView):
+    # Applies many like / dislike operations in one request (e.g. replayed offline likes).
+    # Body: {"operations": [{"post_id": 1, "like_status": "like"}, ...]}
+    # Visibility is checked for all posts at once and writes are set-based.
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        operations = request.data.get("operations")
+
+        if not isinstance(operations, list) or not operations:
+            return Response(
+                {"error": "operations must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(operations) > settings.BULK_LIKE_MAX_OPERATIONS:
+            return Response(
+                {"error": f"At most {settings.BULK_LIKE_MAX_OPERATIONS} operations are allowed."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(operations)
+
+        # 1- Validate items, the last operation on a post wins
+        latest = {}
+
+        for index, operation in enumerate(operations):
+            post_id = operation.get("post_id") if isinstance(operation, dict) else None
+            like_status = operation.get("like_status") if isinstance(operation, dict) else None
+
+            if not isinstance(post_id, int) or isinstance(post_id, bool) or like_status not in ["like", "dislike"]:
+                results[index] = {
+                    "post_id": post_id,
+                    "status": "invalid",
+                    "error": "post_id must be an integer and like_status 'like' or 'dislike'."
+                }
+                continue
+
+            if post_id in latest:
+                results[latest[post_id][0]] = {
+                    "post_id": post_id,
+                    "status": "skipped",
+                    "error": "A later operation on the same post wins."
+                }
+
+            latest[post_id] = (index, like_status)
+
+        # 2- One query for the posts, one visibility resolution for all of them
+        posts = Post.objects.only('id', 'author_id', 'visibility').in_bulk(latest.keys())
+        access = can_view(user, posts.values())
+
+        # 3- One query for the likes that already exist
+        existing = set(
+            PostLike.objects.filter(
+                user=user,
+                post_id__in=[post_id for post_id, allowed in access.items() if allowed]
+            ).values_list('post_id', flat=True)
+        )
+
+        to_like = []
+        to_unlike = []
+
+        for post_id, (index, like_status) in latest.items():
+            if post_id not in posts:
+                outcome = "not_found"
+            elif not access[post_id]:
+                outcome = "forbidden"
+            elif like_status == "like":
+                if post_id in existing:
+                    outcome = "already_liked"
+                else:
+                    outcome = "liked"
+                    to_like.append(post_id)
+            else:
+                if post_id in existing:
+                    outcome = "unliked"
+                    to_unlike.append(post_id)
+                else:
+                    outcome = "not_liked"
+
+            results[index] = {"post_id": post_id, "status": outcome}
+
+        # 4- Set-based writes. Counters follow the rows this request really wrote:
+        # a concurrent like/unlike of the same post may have won the race.
+        with transaction.atomic():
+            new_likes = [PostLike(post_id=post_id, user=user) for post_id in to_like]
+            PostLike.objects.bulk_create(new_likes, ignore_conflicts=True)
+
+            # Rows skipped by ignore_conflicts belong to someone else (other created_at)
+            stored = set(
+                PostLike.objects.filter(user=user, post_id__in=to_like).values_list('post_id', 'created_at')
+            )
+            liked = {like.post_id for like in new_likes if (like.post_id, like.created_at) in stored}
+
+            # DELETE ... RETURNING reports the rows this statement removed, so a like
+            # a concurrent unlike deleted first is not counted twice (nor dropped)
+            unliked = set()
+            if to_unlike:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"""
+                        DELETE FROM {PostLike._meta.db_table}
+                        WHERE user_id = %s AND post_id IN ({', '.join(['%s'] * len(to_unlike))})
+                        RETURNING post_id
+                        """,
+                        [user.id, *to_unlike]
+                    )
+                    unliked = {row[0] for row in cursor.fetchall()}
+
+            deltas = {post_id: (1, 0) for post_id in liked}
+            deltas.update({post_id: (-1, 0) for post_id in unliked})
+            add_many_to_counters(deltas)
+
+        for post_id in to_like:
+            if post_id not in liked:
+                results[latest[post_id][0]]["status"] = "already_liked"
+
+        for post_id in to_unlike:
+            if post_id not in unliked:
+                results[latest[post_id][0]]["status"] = "not_liked"
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class CreateCommentView(APIView):
-    # Create a comment on a post. Allows multiple comments by same user.
+    # GET  -> List comments of a post, oldest first, keyset paginated on comment_number
+    # POST -> Create a comment on a post. Allows multiple comments by same user.
 
     permission_classes = [IsAuthenticated]
 
+    def get(self, request, post_id):
+        post = get_object_or_404(Post, id=post_id)
+
+        # Same visibility rules as commenting
+        if not can_interact(request.user, post):
+            return Response(
+                {"error": "You cannot view comments of this post."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        # Range scan on the (post, comment_number) unique index
+        comments = Comment.objects.filter(
+            post=post,
+            comment_number__gt=post.comments_hidden_upto
+        ).select_related('author')
+
+        paginator = KeysetPaginator(
+            request,
+            ordering=('comment_number',),
+            page_size=settings.COMMENT_PAGE_SIZE,
+            max_page_size=settings.COMMENT_MAX_PAGE_SIZE
+        )
+        page = paginator.paginate(comments)
+
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def post(self, request, post_id):
         user = request.user
         post = get_object_or_404(Post, id=post_id)
@@ -214,11 +668,13 @@ class CreateCommentView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        comment = Comment.objects.create(
-            post=post,
-            author=user,
-            content=content
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                author=user,
+                content=content
+            )
+            add_to_counters(post.id, comments=1)
 
         serializer = CommentSerializer(comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -234,7 +690,7 @@ class CommentModifyView(APIView):
         except ValueError:
             return None
 
-        return Comment.objects.filter(
+        return Comment.objects.visible().filter(
             post_id=post_id,
             comment_number=comment_number
         ).first()
@@ -270,6 +726,10 @@ class CommentModifyView(APIView):
 
         if serializer.is_valid():
             serializer.save()
+
+            # Feed ETags read post.updated_at, so an edited preview comment is noticed
+            Post.objects.filter(pk=comment.post_id).update(updated_at=timezone.now())
+
             return Response(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -291,7 +751,11 @@ class CommentModifyView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        comment.delete()
+        with transaction.atomic():
+            deleted, _ = comment.delete()
+
+            if deleted:
+                add_to_counters(comment.post_id, comments=-1)
 
         return Response(
             {"message": "Comment deleted successfully."},
@@ -301,6 +765,8 @@ class CommentModifyView(APIView):
 
 class DeleteAllPostCommentsView(APIView):
     # DELETE → Delete all comments of a post. Only the post author is allowed.
+    # DELETE ?mode=background → Hide all comments now, delete them in batches in the
+    # background and return 202 with a job id (see CommentPurgeJobView).
 
     permission_classes = [IsAuthenticated]
 
@@ -315,12 +781,29 @@ class DeleteAllPostCommentsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Count before deletion
-        comments_qs = post.comments.all()
-        total_comments = comments_qs.count()
+        if request.query_params.get("mode") == "background":
+            job = start_comment_purge(post, user)
 
-        # Delete all
-        comments_qs.delete()
+            return Response(
+                {
+                    "message": "Comments hidden, deletion scheduled.",
+                    "job_id": str(job.id),
+                    "total_comments": job.total_comments,
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        # Post row locked: new comments wait, so every deleted comment is counted
+        with transaction.atomic():
+            post = Post.objects.select_for_update().get(id=post.id)
+
+            # Count before deletion (comments hidden by a purge job are already uncounted)
+            comments_qs = post.comments.all()
+            total_comments = comments_qs.filter(comment_number__gt=post.comments_hidden_upto).count()
+
+            # Delete all
+            comments_qs.delete()
+            add_to_counters(post.id, comments=-total_comments)
 
         return Response(
             {
@@ -329,3 +812,15 @@ class DeleteAllPostCommentsView(APIView):
             },
             status=status.HTTP_200_OK
         )
+
+
+class CommentPurgeJobView(APIView):
+    # GET → Progress of a background "delete all comments" job
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(CommentPurgeJob, id=job_id, requested_by=request.user)
+
+        serializer = CommentPurgeJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_200_OK)
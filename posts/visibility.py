@@ -0,0 +1,51 @@
+from django.db.models import Q
+
+from friends.cache import get_friend_ids
+from friends.graph import friend_ids_query
+
+
+# Single place for post visibility rules:
+#   PUBLIC  -> everyone
+#   FRIENDS -> author and author's friends
+#   PRIVATE -> author only
+
+
+def visible_to(user, prefix=''):
+    # Q object applying the rules in SQL. Use prefix='post__' for related querysets.
+    # Friends are a subquery on the (user, friend) edge index, not an id list.
+
+    return (
+        Q(**{f'{prefix}author': user}) |
+        Q(**{f'{prefix}visibility': 'PUBLIC'}) |
+        Q(**{f'{prefix}visibility': 'FRIENDS', f'{prefix}author__in': friend_ids_query(user.id)})
+    )
+
+
+def filter_visible(queryset, user, prefix=''):
+    # Restrict a list queryset to what the user is allowed to see
+    return queryset.filter(visible_to(user, prefix))
+
+
+def can_view(user, posts):
+    # Resolve access for many posts at once: {post_id: bool}.
+    # Needs at most one friendship lookup (the cached friend set) for the whole batch.
+
+    friend_ids = None
+    access = {}
+
+    for post in posts:
+        if post.author_id == user.id or post.visibility == 'PUBLIC':
+            access[post.id] = True
+        elif post.visibility == 'FRIENDS':
+            if friend_ids is None:
+                friend_ids = get_friend_ids(user)
+            access[post.id] = post.author_id in friend_ids
+        else:
+            access[post.id] = False
+
+    return access
+
+
+def can_interact(user, post):
+    # Who can interact with the post e.g. see, like and comment on post
+    return can_view(user, [post])[post.id]
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from profiles.models import Profile
+from profiles.serializers import ProfileCardSerializer
+
+
+# Viewer-independent profile cards.
+# The part of a profile response that is the same for every viewer (username, bio,
+# picture, friend_count, timestamps) is serialized once and kept in the shared cache
+# under the user id. Profile/User saves and friendship changes delete the card
+# (see profiles.signals); only is_friend / is_self are computed per request.
+# A second key maps username -> user id so a profile view needs no query on a hit.
+
+
+def _card_key(user_id):
+    return f'profiles:card:{user_id}'
+
+
+def _username_key(username):
+    return f'profiles:username:{username}'
+
+
+def _build_card(profile):
+    return {
+        'user_id': profile.user_id,
+        'profile_id': profile.id,
+        'updated_at': profile.updated_at.isoformat(),
+        'data': dict(ProfileCardSerializer(profile).data),
+    }
+
+
+def get_profile_card(username):
+    # Card of the user with this username, None if there is no such user
+
+    user_id = cache.get(_username_key(username))
+
+    if user_id is not None:
+        card = cache.get(_card_key(user_id))
+
+        # A renamed user's old username may still map here
+        if card is not None and card['data']['username'] == username:
+            return card
+
+    profile = Profile.objects.select_related('user').filter(user__username=username).first()
+    if profile is None:
+        return None
+
+    card = _build_card(profile)
+
+    cache.set_many(
+        {
+            _username_key(username): profile.user_id,
+            _card_key(profile.user_id): card,
+        },
+        settings.PROFILE_CARD_CACHE_TIMEOUT
+    )
+
+    return card
+
+
+def invalidate_profile_cards(*user_ids):
+    keys = [_card_key(user_id) for user_id in user_ids]
+
+    # Now, and again after commit so a card rebuilt from pre-commit data is dropped
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -24,6 +24,7 @@ class Profile(models.Model):
     date_of_birth = models.DateField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -1,10 +1,13 @@
 from rest_framework import serializers
+from friends.cache import get_friend_ids
+from friends.graph import mutual_friend_ids
 from profiles.models import Profile
 
 class ProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     friend_count = serializers.SerializerMethodField()
     is_friend = serializers.SerializerMethodField()
+    mutual_friends_count = serializers.SerializerMethodField()
     is_self = serializers.SerializerMethodField()
 
     class Meta:
@@ -15,32 +18,43 @@ class ProfileSerializer(serializers.ModelSerializer):
             'profile_picture',
             'friend_count',
             'is_friend',
+            'mutual_friends_count',
             'is_self',
             'created_at',
         ]
         read_only_fields = ['created_at']
 
     def get_friend_count(self, obj):
-        from django.db.models import Q
-        from friends.models import Friendship
-
-        return Friendship.objects.filter(
-            Q(user1=obj.user) | Q(user2=obj.user)
-        ).count()
+        return len(get_friend_ids(obj.user))
 
     def get_is_friend(self, obj):
-        from django.db.models import Q
-        from friends.models import Friendship
-
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
 
-        return Friendship.objects.filter(
-            Q(user1=request.user, user2=obj.user) |
-            Q(user1=obj.user, user2=request.user)
-        ).exists()
+        return obj.user_id in get_friend_ids(request.user)
+
+    def get_mutual_friends_count(self, obj):
+        # Merge of two cached sorted id arrays, no query
+        request = self.context.get('request')
+        if not request or not request.user.is_authenticated or request.user.id == obj.user_id:
+            return 0
+
+        return len(mutual_friend_ids(request.user.id, obj.user_id))
 
     def get_is_self(self, obj):
         request = self.context.get('request')
-        return request.user == obj.user if request else False
\ No newline at end of file
+        return request.user == obj.user if request else False
+
+
+class ProfileCardSerializer(ProfileSerializer):
+    # Viewer-independent fields of ProfileSerializer (cached by profiles.cache)
+
+    class Meta(ProfileSerializer.Meta):
+        fields = [
+            'username',
+            'bio',
+            'profile_picture',
+            'friend_count',
+            'created_at',
+        ]
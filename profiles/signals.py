@@ -1,10 +1,35 @@
 from django.conf import settings
-from profiles.models import Profile
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+
+from friends.models import Friendship
+from profiles.cache import invalidate_profile_cards
+from profiles.models import Profile
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     # When new user is created, profile is also created
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+# Cached profile cards (profiles.cache)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    invalidate_profile_cards(instance.id)
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_profile_cards(instance.user_id)
+
+@receiver(post_save, sender=Friendship)
+def friendship_created(sender, instance, created, **kwargs):
+    # friend_count of both users
+    if created:
+        invalidate_profile_cards(instance.user1_id, instance.user2_id)
+
+@receiver(post_delete, sender=Friendship)
+def friendship_deleted(sender, instance, **kwargs):
+    invalidate_profile_cards(instance.user1_id, instance.user2_id)
@@ -1,14 +1,60 @@
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from friends.cache import get_friend_ids, get_friendship_version
+from friends.graph import mutual_friend_ids
+from profiles.cache import get_profile_card
 from profiles.serializers import ProfileSerializer
-from users.models import User
+from Social_Media_app.etags import compute_etag, etag_matches, not_modified, set_etag
 
 # Create your views here.
 
+def profile_card_response(request, username):
+    # Cached card + the per-viewer bits, same shape as ProfileSerializer
+
+    card = get_profile_card(username)
+    if card is None:
+        raise Http404("No Profile matches the given query.")
+
+    user_id = card['user_id']
+
+    # Everything the response reads: the card, both friend sets (is_friend,
+    # mutual_friends_count) and the viewer (is_self)
+    etag = compute_etag(
+        'profile',
+        card['profile_id'],
+        card['updated_at'],
+        card['data'],
+        get_friendship_version(user_id),
+        get_friendship_version(request.user.id),
+        request.user.id
+    )
+
+    # Unchanged since the client's copy
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    data = card['data']
+    picture = data['profile_picture']
+    is_self = user_id == request.user.id
+
+    response = Response({
+        'username': data['username'],
+        'bio': data['bio'],
+        'profile_picture': request.build_absolute_uri(picture) if picture else None,
+        'friend_count': data['friend_count'],
+        'is_friend': user_id in get_friend_ids(request.user),
+        'mutual_friends_count': 0 if is_self else len(mutual_friend_ids(request.user.id, user_id)),
+        'is_self': is_self,
+        'created_at': data['created_at'],
+    })
+
+    return set_etag(response, etag)
+
+
 class MyProfileView(APIView):
 
     # GET  -> View own profile
@@ -18,15 +64,8 @@ class MyProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Get logged-in user's profile
-        profile = request.user.profile
-
-        # Pass request inside context (important for computed fields)
-        serializer = ProfileSerializer(
-            profile,
-            context={'request': request}
-        )
-        return Response(serializer.data)
+        # Logged-in user's profile, served from the cached card
+        return profile_card_response(request, request.user.username)
 
     def put(self, request):
         # Full update of profile
@@ -68,16 +107,5 @@ class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, username):
-        # Get user by username or return 404
-        user = get_object_or_404(User, username=username)
-
-        # Get that user's profile
-        profile = user.profile
-
-        # Pass request context for friend detection, self-check, etc.
-        serializer = ProfileSerializer(
-            profile,
-            context={'request': request}
-        )
-
-        return Response(serializer.data)
\ No newline at end of file
+        # Cached card, 404 if no such user
+        return profile_card_response(request, username)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from users.models import User
+from users.models import User, normalize_search
+from users.search import prefix_filter
 
 # Register your models here.
 
@@ -32,7 +33,7 @@ class UserAdmin(BaseUserAdmin):
         "is_email_verified",
     )
 
-    # Search functionality
+    # Search functionality (case-insensitive prefix, see get_search_results)
     search_fields = ("email", "username")
 
     # Default ordering
@@ -74,4 +75,14 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Prefix match on the indexed normalized columns instead of icontains scans
+        prefix = normalize_search(search_term.strip())
+        if not prefix:
+            return queryset, False
+
+        return queryset.filter(
+            prefix_filter('username_normalized', prefix) | prefix_filter('email_normalized', prefix)
+        ), False
+
 admin.site.register(User, UserAdmin)
\ No newline at end of file
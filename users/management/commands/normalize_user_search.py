@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User, normalize_search
+
+
+class Command(BaseCommand):
+
+    # Fill username_normalized / email_normalized for users created before the columns existed
+    # (or changed with queryset.update()).
+    # Usage: python manage.py normalize_user_search [--batch-size 1000]
+
+    help = "Backfill the normalized username/email columns used by user search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+
+        while True:
+            users = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'username', 'email', 'username_normalized', 'email_normalized')[:batch_size]
+            )
+            if not users:
+                break
+
+            last_id = users[-1].id
+
+            changed = []
+            for user in users:
+                username, email = normalize_search(user.username), normalize_search(user.email)
+
+                if (user.username_normalized, user.email_normalized) != (username, email):
+                    user.username_normalized, user.email_normalized = username, email
+                    changed.append(user)
+
+            User.objects.bulk_update(changed, ['username_normalized', 'email_normalized'])
+            total += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f"Normalized {total} user(s)."))
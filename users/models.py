@@ -7,6 +7,10 @@ from datetime import timedelta
 
 # Create your models here.
 
+def normalize_search(value):
+    # Case-folded form stored for indexed prefix search (see users.search)
+    return (value or '').casefold()
+
 
 class User(AbstractUser):
     # Email as unique identifier for login
@@ -40,10 +44,30 @@ class User(AbstractUser):
     # Email verification check
     is_email_verified = models.BooleanField(default=False)
 
+    # Case-folded username/email, kept in sync by save(). Prefix search is an index range scan on these
+    username_normalized = models.CharField(max_length=150, db_index=True, editable=False, default='')
+    email_normalized = models.CharField(max_length=254, db_index=True, editable=False, default='')
+
     # Use email as login field
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']  # Username still required for superuser
 
+    def save(self, *args, **kwargs):
+        self.username_normalized = normalize_search(self.username)
+        self.email_normalized = normalize_search(self.email)
+
+        # Partial saves that touch username/email also write their normalized copy
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'username' in update_fields:
+                update_fields.add('username_normalized')
+            if 'email' in update_fields:
+                update_fields.add('email_normalized')
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
@@ -55,6 +79,12 @@ class EmailVerificationOTP(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # Latest OTP with this code for a user (VerifyOTPSerializer)
+            models.Index(fields=['user', 'otp', '-created_at'], name='otp_user_code_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(minutes=10)
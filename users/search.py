@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db.models import Q
+
+from friends.cache import get_friend_ids
+from friends.graph import mutual_counts
+from users.models import User, normalize_search
+
+
+# Username / email typeahead.
+# Matching is a case-insensitive prefix search done as a range scan on the
+# indexed, case-folded columns: prefix <= value < next(prefix). Unlike LIKE or
+# icontains, it uses the index on every backend.
+# The best candidates are then ranked: friends, then friends-of-friends by
+# number of mutual friends, then alphabetically.
+
+
+def prefix_filter(field, prefix):
+    # Q for "field starts with prefix" as an index range
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+
+
+def matching_user_ids(text, limit):
+    # Ids of users whose username or email starts with text (case-insensitive)
+
+    prefix = normalize_search(text.strip())
+    if not prefix:
+        return []
+
+    ids = []
+    for field in ('username_normalized', 'email_normalized'):
+        ids.extend(
+            User.objects.filter(prefix_filter(field, prefix), is_active=True)
+            .order_by(field)
+            .values_list('id', flat=True)[:limit]
+        )
+
+    # Keep first occurrence
+    return list(dict.fromkeys(ids))
+
+
+def search_users(viewer, text, limit):
+    candidate_ids = [
+        user_id for user_id in matching_user_ids(text, settings.USER_SEARCH_CANDIDATES)
+        if user_id != viewer.id
+    ]
+
+    if not candidate_ids:
+        return []
+
+    friend_ids = get_friend_ids(viewer)
+    mutual = mutual_counts(viewer, candidate_ids)
+
+    users = list(User.objects.filter(id__in=candidate_ids).select_related('profile'))
+
+    for user in users:
+        user.is_friend = user.id in friend_ids
+        user.mutual_friends = mutual.get(user.id, 0)
+
+    users.sort(key=lambda user: (not user.is_friend, -user.mutual_friends, user.username_normalized))
+    return users[:limit]
@@ -63,6 +63,24 @@ class UserListSerializer(serializers.ModelSerializer):
             'is_email_verified'
         )
 
+class UserSearchSerializer(serializers.ModelSerializer):
+
+    # Typeahead result (users.search sets is_friend / mutual_friends on each user)
+
+    profile_picture = serializers.ImageField(source='profile.profile_picture', read_only=True)
+    is_friend = serializers.BooleanField(read_only=True)
+    mutual_friends = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = (
+            'id',
+            'username',
+            'profile_picture',
+            'is_friend',
+            'mutual_friends',
+        )
+
 class VerifyOTPSerializer(serializers.Serializer):
     email = serializers.EmailField()
     otp = serializers.CharField(max_length=6)
@@ -1,3 +1,32 @@
 from django.test import TestCase
 
+from Social_Media_app.testing import QueryPlanTestMixin
+from users.models import EmailVerificationOTP, User
+from users.search import prefix_filter
+
+
 # Create your tests here.
+
+class UserQueryPlanTests(QueryPlanTestMixin, TestCase):
+
+    # Hot user lookups must be served by an index, never a full table scan
+
+    def setUp(self):
+        self.user = User.objects.create(email="plan@example.com", username="plan")
+
+    def test_otp_lookup(self):
+        # VerifyOTPSerializer: latest OTP with this code
+        self.assertNoFullScan(
+            EmailVerificationOTP.objects.filter(user=self.user, otp="123456").order_by('-created_at')[:1]
+        )
+
+    def test_login_by_email(self):
+        self.assertNoFullScan(User.objects.filter(email="plan@example.com"))
+
+    def test_typeahead_prefix(self):
+        for field in ('username_normalized', 'email_normalized'):
+            with self.subTest(field=field):
+                self.assertNoFullScan(
+                    User.objects.filter(prefix_filter(field, "pl"), is_active=True)
+                    .order_by(field).values_list('id', flat=True)[:50]
+                )
@@ -2,11 +2,14 @@ from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from users.serializers import RegisterSerializer, LoginSerializer, UserListSerializer, VerifyOTPSerializer
+from users.serializers import RegisterSerializer, LoginSerializer, UserListSerializer, VerifyOTPSerializer, \
+    UserSearchSerializer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from django.utils.http import urlsafe_base64_decode
 
+from users.search import search_users
 from users.utils import send_verification_email
 from users.tokens import email_verification_token
 
@@ -74,6 +77,32 @@ class UserListView(APIView):
         serializer = UserListSerializer(users, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+class UserSearchView(APIView):
+    # GET -> Typeahead: users whose username or email starts with ?q= (case-insensitive)
+    # Friends first, then friends-of-friends by mutual friend count. ?limit=<n> (max USER_SEARCH_MAX_LIMIT)
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+
+        if not text:
+            return Response(
+                {"error": "q is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', settings.USER_SEARCH_LIMIT))
+        except ValueError:
+            limit = settings.USER_SEARCH_LIMIT
+
+        limit = max(1, min(limit, settings.USER_SEARCH_MAX_LIMIT))
+
+        users = search_users(request.user, text, limit)
+        serializer = UserSearchSerializer(users, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]  # Only logged-in users can logout
 